@@ -2,16 +2,18 @@ from __future__ import annotations
 
 import logging
 from collections import Counter
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Set
+from typing import List, Optional, Set, Tuple
 
 import numpy as np
 
+from .collections_index import CollectionPathIndex
 from .faiss_store import FaissIndex
 from .models import ProfileArtifacts, ZoteroItem
 from .settings import Settings
 from .storage import ProfileStorage
-from .utils import json_dumps, utc_now
+from .utils import hash_content, json_dumps_bytes, utc_now
 from .vectorizer import TextVectorizer
 
 logger = logging.getLogger(__name__)
@@ -29,64 +31,28 @@ def _get_allowed_collection_ids(settings: Settings, storage: ProfileStorage) ->
         logger.warning("No collection data found in database, skipping filter")
         return set()
 
+    path_index = CollectionPathIndex.from_rows(collections_data)
+
     allowed = set()
 
     # 按 ID 过滤
     for coll_id in filter_config.ids:
-        if coll_id in collections_data:
+        if coll_id in path_index:
             allowed.add(coll_id)
             if filter_config.include_children:
-                allowed.update(_get_children_ids(coll_id, collections_data))
+                allowed.update(path_index.descendants(coll_id))
 
     # 按名称过滤
     for name_path in filter_config.names:
-        coll_id = _find_collection_id_by_path(name_path, collections_data)
+        coll_id = path_index.resolve(name_path)
         if coll_id:
             allowed.add(coll_id)
             if filter_config.include_children:
-                allowed.update(_get_children_ids(coll_id, collections_data))
+                allowed.update(path_index.descendants(coll_id))
 
     return allowed
 
 
-def _get_children_ids(parent_id: str, collections_data: dict) -> Set[str]:
-    """递归获取所有子分类 ID"""
-    children = set()
-    for coll_id, coll in collections_data.items():
-        if coll.get("parent_key") == parent_id:
-            children.add(coll_id)
-            children.update(_get_children_ids(coll_id, collections_data))
-    return children
-
-
-def _find_collection_id_by_path(path: str, collections_data: dict) -> str | None:
-    """按路径查找分类 ID"""
-    parts = [p.strip() for p in path.split("/") if p.strip()]
-    if not parts:
-        return None
-
-    target_name = parts[-1]
-
-    # 构建 ID -> 完整路径的映射
-    def get_full_path(coll_id: str) -> str:
-        names = []
-        current_id = coll_id
-        while current_id and current_id in collections_data:
-            coll = collections_data[current_id]
-            names.insert(0, coll["name"])
-            current_id = coll.get("parent_key")
-        return "/".join(names)
-
-    # 查找匹配的分类
-    for coll_id, coll in collections_data.items():
-        if coll["name"] == target_name:
-            full_path = get_full_path(coll_id)
-            if len(parts) == 1 or full_path == path or full_path.endswith("/" + path):
-                return coll_id
-
-    return None
-
-
 class ProfileBuilder:
     def __init__(
         self,
@@ -98,7 +64,12 @@ class ProfileBuilder:
         self.base_dir = Path(base_dir)
         self.storage = storage
         self.settings = settings
-        self.vectorizer = vectorizer or TextVectorizer()
+        self._owns_vectorizer = vectorizer is None
+        self.vectorizer = vectorizer or TextVectorizer(
+            parallel=settings.encode_parallel,
+            backend=settings.encode_backend,
+            cache_dir=self.base_dir / "data" / "models",
+        )
         self.artifacts = ProfileArtifacts(
             sqlite_path=str(self.base_dir / "data" / "profile.sqlite"),
             faiss_path=str(self.base_dir / "data" / "faiss.index"),
@@ -106,67 +77,138 @@ class ProfileBuilder:
         )
 
     def run(self) -> ProfileArtifacts:
+        try:
+            return self._run()
+        finally:
+            if self._owns_vectorizer:
+                self.vectorizer.close()
+
+    def _run(self) -> ProfileArtifacts:
+        # 存储精度改变后先转换侧车文件，否则要等条目变化时才整体作废重编码
+        converted = self.storage.convert_embedding_dtype()
+        if converted:
+            logger.info(
+                "Converted %d stored embeddings to %s", converted, self.storage.embedding_dtype
+            )
+
         # 获取允许的分类 ID
         allowed_ids = _get_allowed_collection_ids(self.settings, self.storage)
+        batch_size = self.settings.encode_batch_size
 
-        # 获取条目并应用分类过滤
-        all_items = list(self.storage.iter_items())
+        # 在 SQLite 中计数，无需先物化全部条目
+        total = self.storage.count_items()
         if allowed_ids:
-            items = [
-                item for item in all_items
-                if any(cid in allowed_ids for cid in item.collections)
-            ]
+            item_count = self.storage.count_items_in_collections(allowed_ids)
             logger.info(
                 "Collection filter applied: %d/%d items match target collections",
-                len(items), len(all_items)
+                item_count, total
             )
         else:
-            items = all_items
+            item_count = total
 
-        if not items:
+        if not item_count:
             raise RuntimeError("No items found in storage; run ingest before building profile.")
 
-        logger.info("Vectorizing %d library items", len(items))
-        texts = [item.content_for_embedding() for item in items]
-        vectors = self.vectorizer.encode(texts)
-
-        for item, vector in zip(items, vectors):
-            self.storage.set_embedding(item.key, vector.tobytes())
-
-        logger.info("Building FAISS index")
-        index, order = FaissIndex.from_vectors(vectors)
-        index.save(self.artifacts.faiss_path)
+        logger.info("Vectorizing %d library items", item_count)
+
+        # 流式读取条目，按批次编码并立即写回 embedding；内容未变化的条目复用已存储的向量
+        acc = _ProfileAccumulator(capacity=item_count)
+        rows = self.storage.iter_items_with_embedding(allowed_ids or None)
+        batch: List[Tuple[ZoteroItem, Optional[str], Optional[np.ndarray]]] = []
+        for item, content_hash, embedding, embedding_hash in rows:
+            fingerprint = self._embedding_fingerprint(content_hash)
+            cached = None
+            if fingerprint and embedding is not None and embedding_hash == fingerprint:
+                cached = embedding
+            batch.append((item, fingerprint, cached))
+            if len(batch) >= batch_size:
+                self._encode_batch(batch, acc)
+                batch = []
+        if batch:
+            self._encode_batch(batch, acc)
+
+        logger.info(
+            "Vectorized %d library items in batches of %d (%d encoded, %d reused)",
+            acc.count, batch_size, acc.encoded, acc.count - acc.encoded
+        )
+        acc.index.finalize()
+        acc.index.save(self.artifacts.faiss_path)
 
-        profile_summary = self._summarize(items, vectors)
+        profile_summary = self._summarize(acc)
         json_path = Path(self.artifacts.profile_json_path)
         json_path.parent.mkdir(parents=True, exist_ok=True)
-        json_path.write_text(json_dumps(profile_summary, indent=2), encoding="utf-8")
+        json_path.write_bytes(json_dumps_bytes(profile_summary, indent=2))
         logger.info("Wrote profile summary to %s", json_path)
         return self.artifacts
 
-    def _summarize(self, items: List[ZoteroItem], vectors: np.ndarray) -> dict:
-        authors = Counter()
-        venues = Counter()
-        for item in items:
-            authors.update(item.creators)
-            venue = item.raw.get("data", {}).get("publicationTitle")
-            if venue:
-                venues.update([venue])
-
-        centroid = np.mean(vectors, axis=0)
+    def _encode_batch(
+        self,
+        batch: List[Tuple[ZoteroItem, Optional[str], Optional[np.ndarray]]],
+        acc: "_ProfileAccumulator",
+    ) -> None:
+        """编码批次中没有可复用向量的条目，写回 embedding 后累计到 acc"""
+        pending = [(item, fingerprint) for item, fingerprint, cached in batch if cached is None]
+        encoded = iter(())
+        if pending:
+            texts = [item.content_for_embedding() for item, _ in pending]
+            new_vectors = self.vectorizer.encode(texts, batch_size=len(pending))
+            self.storage.set_embeddings_bulk(
+                (item.key, vector, fingerprint)
+                for (item, fingerprint), vector in zip(pending, new_vectors)
+            )
+            encoded = iter(new_vectors)
+        vectors = np.stack([cached if cached is not None else next(encoded) for _, _, cached in batch])
+        acc.add([item for item, _, _ in batch], vectors, encoded=len(pending))
+
+    def _embedding_fingerprint(self, content_hash: Optional[str]) -> Optional[str]:
+        """embedding 缓存键：内容哈希 + 模型名，任一变化都需要重新编码"""
+        if not content_hash:
+            return None
+        return hash_content(self.vectorizer.embedding_id, content_hash)
+
+    def _summarize(self, acc: "_ProfileAccumulator") -> dict:
+        centroid = acc.vector_sum / acc.count
         centroid = centroid / (np.linalg.norm(centroid) + 1e-12)
 
-        top_authors = [{"author": k, "count": v} for k, v in authors.most_common(20)]
-        top_venues = [{"venue": k, "count": v} for k, v in venues.most_common(20)]
+        top_authors = [{"author": k, "count": v} for k, v in acc.authors.most_common(20)]
+        top_venues = [{"venue": k, "count": v} for k, v in acc.venues.most_common(20)]
 
         return {
             "generated_at": utc_now().isoformat(),
-            "item_count": len(items),
+            "item_count": acc.count,
             "model": self.vectorizer.model_name,
-            "centroid": centroid.tolist(),
+            "centroid": centroid,
             "top_authors": top_authors,
             "top_venues": top_venues,
         }
 
 
+@dataclass
+class _ProfileAccumulator:
+    """按批次累计画像统计：作者/期刊计数、向量的 float32 累加和，并把向量流式写入 FAISS"""
+    capacity: int
+    authors: Counter = field(default_factory=Counter)
+    venues: Counter = field(default_factory=Counter)
+    index: Optional[FaissIndex] = None
+    vector_sum: Optional[np.ndarray] = None
+    count: int = 0
+    encoded: int = 0
+
+    def add(self, batch: List[ZoteroItem], vectors: np.ndarray, *, encoded: int) -> None:
+        self.authors.update(creator for item in batch for creator in item.creators)
+        venues = (item.raw.get("data", {}).get("publicationTitle") for item in batch)
+        self.venues.update(venue for venue in venues if venue)
+        if self.index is None:
+            # 第一个批次确定维度后创建索引，之后每个批次写入后即可释放
+            self.index = FaissIndex.start(vectors.shape[1], self.capacity)
+        self.index.add(vectors)
+        batch_sum = vectors.sum(axis=0, dtype=np.float32)
+        if self.vector_sum is None:
+            self.vector_sum = batch_sum
+        else:
+            self.vector_sum += batch_sum
+        self.count += len(batch)
+        self.encoded += encoded
+
+
 __all__ = ["ProfileBuilder"]
@@ -4,21 +4,17 @@ import argparse
 import logging
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from dotenv import load_dotenv
 
-from .build_profile import ProfileBuilder
-from .dedupe import DedupeEngine
-from .fetch_new import CandidateFetcher
-from .ingest_zotero_api import ZoteroIngestor, ZoteroCollection
+from .collections_index import CollectionPathIndex
 from .logging_utils import setup_logging
-from .models import RankedWork
-from .push_to_zotero import ZoteroPusher
-from .rss_writer import write_rss
-from .score_rank import WorkRanker
 from .settings import Settings, load_settings
 from .storage import ProfileStorage
-from .report_html import render_html
+
+if TYPE_CHECKING:
+    from .ingest_zotero_api import ZoteroCollection
+    from .models import RankedWork
 
 load_dotenv()  # Load default .env if present
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -68,10 +64,12 @@ def run_collections(settings: Settings, *, tree: bool) -> None:
 
     print(f"\nFound {len(collections)} collections in your Zotero library:\n")
 
+    # 完整路径一次性构建（记忆化、可处理父链成环），打印时只做字典查找
+    paths = CollectionPathIndex.from_collections(collections)
     if tree:
-        _print_collection_tree(collections)
+        _print_collection_tree(collections, paths)
     else:
-        _print_collection_flat(collections)
+        _print_collection_flat(collections, paths)
 
     print("\n" + "=" * 60)
     print("Usage in config/zotero.yaml:")
@@ -83,47 +81,49 @@ def run_collections(settings: Settings, *, tree: bool) -> None:
     print("=" * 60 + "\n")
 
 
-def _print_collection_tree(collections: dict[str, ZoteroCollection], indent: int = 0) -> None:
-    """以树形结构打印分类"""
-    # 找到顶层分类（没有父分类的）
-    if indent == 0:
-        roots = [c for c in collections.values() if c.parent_key is None]
-        for root in sorted(roots, key=lambda x: x.name):
-            _print_single_collection(root, collections, indent)
-    else:
-        pass  # 递归调用处理
+def _print_collection_tree(collections: dict[str, ZoteroCollection], paths: CollectionPathIndex) -> None:
+    """以树形结构打印分类（显式栈深度优先遍历，不受递归深度限制）"""
+    roots = [c for c in collections.values() if c.parent_key is None]
+    stack = [(root, 0) for root in sorted(roots, key=lambda x: x.name, reverse=True)]
+    printed: set[str] = set()
+    while stack:
+        coll, indent = stack.pop()
+        if coll.key in printed:
+            continue
+        printed.add(coll.key)
+        _print_single_collection(coll, paths, indent)
+        children = sorted(coll.children, key=lambda x: x.name, reverse=True)
+        stack.extend((child, indent + 1) for child in children)
 
 
 def _print_single_collection(
     coll: ZoteroCollection,
-    all_collections: dict[str, ZoteroCollection],
+    paths: CollectionPathIndex,
     indent: int
 ) -> None:
-    """打印单个分类及其子分类"""
+    """打印单个分类"""
     prefix = "  " * indent + ("├── " if indent > 0 else "")
     print(f"{prefix}{coll.name}")
     print(f"{'  ' * indent}    ID: {coll.key}")
-    print(f"{'  ' * indent}    Path: {coll.full_path(all_collections)}")
+    print(f"{'  ' * indent}    Path: {paths.full_path(coll.key)}")
     print()
 
-    for child in sorted(coll.children, key=lambda x: x.name):
-        _print_single_collection(child, all_collections, indent + 1)
-
 
-def _print_collection_flat(collections: dict[str, ZoteroCollection]) -> None:
+def _print_collection_flat(collections: dict[str, ZoteroCollection], paths: CollectionPathIndex) -> None:
     """以扁平列表打印分类（按完整路径排序）"""
-    items = []
-    for coll in collections.values():
-        full_path = coll.full_path(collections)
-        items.append((full_path, coll.key, coll.name))
+    items = [(paths.full_path(coll.key) or coll.name, coll.key) for coll in collections.values()]
 
-    for full_path, key, name in sorted(items):
+    for full_path, key in sorted(items):
         print(f"  {full_path}")
         print(f"    ID: {key}")
         print()
 
 
 def run_profile(base_dir: Path, settings: Settings, storage: ProfileStorage, *, full: bool) -> None:
+    # numpy / faiss / sentence-transformers 较重，仅在执行命令时导入
+    from .build_profile import ProfileBuilder
+    from .ingest_zotero_api import ZoteroIngestor
+
     ingest = ZoteroIngestor(storage, settings)
     stats = ingest.run(full=full)
     log_msg = f"Ingest stats: fetched={stats.fetched} updated={stats.updated} removed={stats.removed}"
@@ -150,6 +150,14 @@ def run_watch(
     top: int,
     push: bool,
 ) -> None:
+    from .dedupe import DedupeEngine
+    from .fetch_new import CandidateFetcher
+    from .ingest_zotero_api import ZoteroIngestor
+    from .push_to_zotero import ZoteroPusher
+    from .report_html import render_html
+    from .rss_writer import write_rss
+    from .score_rank import WorkRanker
+
     ingest = ZoteroIngestor(storage, settings)
     ingest.run(full=False)
 
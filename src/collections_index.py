@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Optional, Protocol, Set, Tuple
+
+
+class _CollectionLike(Protocol):
+    """CollectionPathIndex.from_collections 需要的分类字段（如 ZoteroCollection）"""
+
+    key: str
+    name: str
+    parent_key: Optional[str]
+
+
+class CollectionPathIndex:
+    """分类路径索引：一次遍历构建完整路径、名称和父子关系的查找表。
+
+    同时供 CollectionFilter（ZoteroCollection 对象）和 build_profile
+    （数据库中的分类行）使用，所有查询均为字典查找。
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, Optional[str]]]):
+        """entries 为 (key, name, parent_key)，顺序决定同名/同后缀时的优先级"""
+        self._names: Dict[str, str] = {}
+        self._parents: Dict[str, Optional[str]] = {}
+        for key, name, parent_key in entries:
+            self._names[key] = name
+            self._parents[key] = parent_key or None
+
+        self._children: Dict[str, List[str]] = {}
+        self._keys_by_name: Dict[str, List[str]] = {}
+        for key, name in self._names.items():
+            self._keys_by_name.setdefault(name, []).append(key)
+            parent_key = self._parents[key]
+            if parent_key:
+                self._children.setdefault(parent_key, []).append(key)
+
+        self._full_paths = self._build_full_paths()
+        # 路径（含所有后缀）-> 分类 ID；按 entries 顺序遍历，先出现的分类优先
+        # （_full_paths 按祖先优先的顺序填充，不能直接遍历）
+        self._key_by_path: Dict[str, str] = {}
+        for key in self._names:
+            segments = self._full_paths[key].split("/")
+            for i in range(len(segments)):
+                self._key_by_path.setdefault("/".join(segments[i:]), key)
+
+    @classmethod
+    def from_collections(cls, collections: Mapping[str, _CollectionLike]) -> "CollectionPathIndex":
+        """从 {key: ZoteroCollection} 构建"""
+        return cls((c.key, c.name, c.parent_key) for c in collections.values())
+
+    @classmethod
+    def from_rows(cls, collections_data: Dict[str, dict]) -> "CollectionPathIndex":
+        """从 ProfileStorage.load_collections() 的结果构建"""
+        return cls(
+            (key, row["name"], row.get("parent_key")) for key, row in collections_data.items()
+        )
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._names
+
+    def full_path(self, key: str) -> Optional[str]:
+        return self._full_paths.get(key)
+
+    def keys_by_name(self, name: str) -> List[str]:
+        return self._keys_by_name.get(name, [])
+
+    def resolve(self, name_or_path: str) -> Optional[str]:
+        """按名称或路径（完整路径或其后缀，如 '父分类/子分类'）查找分类 ID"""
+        parts = [p.strip() for p in name_or_path.split("/") if p.strip()]
+        if not parts:
+            return None
+        return self._key_by_path.get("/".join(parts))
+
+    def descendants(self, key: str) -> Set[str]:
+        """返回分类自身及其所有子分类的 ID"""
+        result = {key}
+        queue = deque([key])
+        while queue:
+            for child_key in self._children.get(queue.popleft(), ()):
+                if child_key not in result:
+                    result.add(child_key)
+                    queue.append(child_key)
+        return result
+
+    def _build_full_paths(self) -> Dict[str, str]:
+        """沿父链向上遍历并记忆化，每个节点的完整路径只计算一次"""
+        paths: Dict[str, str] = {}
+        for key in self._names:
+            chain: List[str] = []
+            seen: Set[str] = set()
+            current: Optional[str] = key
+            while current and current in self._names and current not in paths and current not in seen:
+                chain.append(current)
+                seen.add(current)
+                current = self._parents[current]
+            prefix = paths.get(current) if current and current not in seen else None
+            for chain_key in reversed(chain):
+                name = self._names[chain_key]
+                prefix = name if prefix is None else f"{prefix}/{name}"
+                paths[chain_key] = prefix
+        return paths
+
+
+__all__ = ["CollectionPathIndex"]
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 import re
-from typing import Iterable, List, Set
+from typing import Iterable, List, Sequence, Set
 
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
 
 from .models import CandidateWork
 from .storage import ProfileStorage
@@ -16,28 +17,34 @@ class DedupeEngine:
     def __init__(self, storage: ProfileStorage, title_threshold: float = 0.9):
         self.storage = storage
         self.title_threshold = title_threshold
-        self.existing_doi: Set[str] = set()
-        self.existing_ids: Set[str] = set()
+        # DOI / 标识符集合只保存 8 字节指纹，库很大时比保存完整字符串省内存
+        self.existing_doi: Set[bytes] = set()
+        self.existing_ids: Set[bytes] = set()
         self.existing_titles: List[str] = []
+        self.existing_title_set: Set[str] = set()
         self._load_existing()
 
     def _load_existing(self) -> None:
         for item in self.storage.iter_items():
             if item.doi:
-                self.existing_doi.add(_normalize_identifier(item.doi))
+                self.existing_doi.add(_fingerprint(_normalize_identifier(item.doi)))
             if item.url:
-                self.existing_ids.add(_normalize_identifier(item.url))
-            self.existing_titles.append(_normalize_title(item.title))
+                self.existing_ids.add(_fingerprint(_normalize_identifier(item.url)))
+            title = _normalize_title(item.title)
+            if title and title not in self.existing_title_set:
+                self.existing_title_set.add(title)
+                self.existing_titles.append(title)
 
     def filter(self, candidates: Iterable[CandidateWork]) -> List[CandidateWork]:
         source = list(candidates)
         deduped: List[CandidateWork] = []
         candidate_titles: List[str] = []
-        seen_keys: Set[str] = set()
+        candidate_title_set: Set[str] = set()
+        seen_keys: Set[bytes] = set()
 
         for work in source:
-            key = _normalize_identifier(work.identifier)
-            doi = _normalize_identifier(work.doi) if work.doi else None
+            key = _fingerprint(_normalize_identifier(work.identifier))
+            doi = _fingerprint(_normalize_identifier(work.doi)) if work.doi else None
             title = _normalize_title(work.title)
 
             if doi and doi in self.existing_doi:
@@ -48,12 +55,18 @@ class DedupeEngine:
             if key in self.existing_ids or key in seen_keys:
                 logger.debug("Skipping %s due to identifier duplication", work.identifier)
                 continue
+            # 完全相同的标题先走集合查找，其余再做模糊匹配
+            if title and (title in self.existing_title_set or title in candidate_title_set):
+                logger.debug("Skipping %s due to title duplication", work.identifier)
+                continue
             if self._is_title_duplicate(title) or _is_title_in_list(title, candidate_titles, self.title_threshold):
                 logger.debug("Skipping %s due to title similarity", work.identifier)
                 continue
 
             deduped.append(work)
-            candidate_titles.append(title)
+            if title:
+                candidate_titles.append(title)
+                candidate_title_set.add(title)
             seen_keys.add(key)
             if doi:
                 seen_keys.add(doi)
@@ -68,19 +81,23 @@ def _normalize_identifier(value: str) -> str:
     return (value or "").lower().strip()
 
 
+def _fingerprint(value: str) -> bytes:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+
+
 def _normalize_title(title: str) -> str:
     normalized = re.sub(r"\s+", " ", title or "").strip().lower()
     return normalized
 
 
-def _is_title_in_list(title: str, title_list: Iterable[str], threshold: float) -> bool:
-    for existing in title_list:
-        if not existing:
-            continue
-        score = fuzz.token_set_ratio(title, existing) / 100.0
-        if score >= threshold:
-            return True
-    return False
+def _is_title_in_list(title: str, title_list: Sequence[str], threshold: float) -> bool:
+    # extractOne 在 C 层遍历候选并按阈值剪枝，避免逐条调用 Python 层打分
+    if not title or not title_list:
+        return False
+    match = process.extractOne(
+        title, title_list, scorer=fuzz.token_set_ratio, score_cutoff=threshold * 100.0
+    )
+    return match is not None
 
 
 __all__ = ["DedupeEngine"]
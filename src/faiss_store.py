@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import logging
+import math
+import os
 from pathlib import Path
-from typing import Tuple
+from typing import List, Tuple
 
 import numpy as np
 
@@ -13,6 +15,19 @@ try:
 except ImportError:  # pragma: no cover - runtime dependency
     faiss = None  # type: ignore
 
+# 条目数少于 HNSW_MIN_ITEMS 时使用精确的 IndexFlatIP；达到该阈值后改用无需训练的
+# HNSW 图索引；达到 IVF_MIN_ITEMS 后改用需训练、内存占用更小的 IVF 索引
+HNSW_MIN_ITEMS = 10_000
+IVF_MIN_ITEMS = 50_000
+# 相似度直接参与打分，参数按 top-1 召回率选择（384 维、2 万条测试约 0.95）
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128
+# IVF 训练样本固定上限：只缓存这么多向量用于训练，之后的批次直接写入；
+# 簇数受样本量限制，保证每簇至少 IVF_MIN_POINTS_PER_LIST 个训练点（FAISS 的建议下限）
+IVF_TRAIN_SIZE = 25_000
+IVF_MIN_POINTS_PER_LIST = 39
+
 
 class FaissIndex:
     def __init__(self, dim: int, index: "faiss.Index" | None = None):  # type: ignore
@@ -20,6 +35,72 @@ class FaissIndex:
             raise RuntimeError("faiss is required; install faiss-cpu or adjust configuration.")
         self.dim = dim
         self.index = index or faiss.IndexFlatIP(dim)
+        self._pending: List[np.ndarray] = []
+        self._pending_count = 0
+        self._train_size = 0
+        self._gpu_resources = None
+
+    @classmethod
+    def start(cls, dim: int, n_total: int) -> "FaissIndex":
+        """创建可按批次 add 的空索引。
+
+        小库使用 IndexFlatIP；中等规模使用 IndexHNSWFlat（内积度量），可直接写入；
+        大库使用 IndexIVFFlat（内积度量），先缓存前 IVF_TRAIN_SIZE 个向量用于训练，
+        训练后再写入，其余批次直接写入。
+        """
+        if faiss is None:
+            raise RuntimeError("faiss is required; install faiss-cpu or adjust configuration.")
+        if n_total < HNSW_MIN_ITEMS:
+            return cls(dim)
+        if n_total < IVF_MIN_ITEMS:
+            index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            index.hnsw.efSearch = HNSW_EF_SEARCH
+            logger.info("Using HNSW index (M=%d) for %d items", HNSW_M, n_total)
+            return cls(dim, index)
+        nlist = min(int(4 * math.sqrt(n_total)), IVF_TRAIN_SIZE // IVF_MIN_POINTS_PER_LIST)
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = min(nlist, 16)
+        instance = cls(dim, index)
+        instance._train_size = min(n_total, IVF_TRAIN_SIZE)
+        logger.info("Using IVF index with %d lists for %d items", nlist, n_total)
+        return instance
+
+    def add(self, vectors: np.ndarray) -> None:
+        if self.index.is_trained:
+            self.index.add(vectors)
+            return
+        self._pending.append(np.ascontiguousarray(vectors, dtype=np.float32))
+        self._pending_count += len(vectors)
+        if self._pending_count >= self._train_size:
+            self._train_pending()
+
+    def finalize(self) -> None:
+        """训练样本不足阈值时（实际条目数少于预估）用已缓存的向量完成训练；
+        数量不足以训练 IVF 时改用适合实际条目数的 Flat/HNSW 索引"""
+        if self.index.is_trained or not self._pending:
+            return
+        if self._pending_count >= self.index.nlist * IVF_MIN_POINTS_PER_LIST:
+            self._train_pending()
+            return
+        logger.info(
+            "Only %d vectors for %d IVF lists; falling back to a non-IVF index",
+            self._pending_count, self.index.nlist,
+        )
+        vectors = np.concatenate(self._pending, axis=0)
+        self._pending = []
+        self._pending_count = 0
+        self.index = FaissIndex.start(self.dim, len(vectors)).index
+        self.index.add(vectors)
+
+    def _train_pending(self) -> None:
+        sample = np.concatenate(self._pending, axis=0)
+        self._pending = []
+        self._pending_count = 0
+        logger.info("Training FAISS index on %d vectors", len(sample))
+        self.index.train(sample)
+        self.index.add(sample)
 
     @classmethod
     def from_vectors(cls, vectors: np.ndarray) -> Tuple["FaissIndex", np.ndarray]:
@@ -32,21 +113,52 @@ class FaissIndex:
 
     def save(self, path: Path | str) -> None:
         logger.info("Saving FAISS index to %s", path)
-        faiss.write_index(self.index, str(path))
+        # 先写临时文件再替换：已被 mmap 打开的旧索引不会被原地截断
+        tmp_path = f"{path}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, path)
 
     @classmethod
-    def load(cls, path: Path | str) -> "FaissIndex":
+    def load(cls, path: Path | str, *, use_gpu: bool = False) -> "FaissIndex":
         if faiss is None:
             raise RuntimeError("faiss is required; install faiss-cpu or adjust configuration.")
-        index = faiss.read_index(str(path))
+        index = faiss.read_index(str(path), _read_flags())
         if index.ntotal == 0:
             raise ValueError("Loaded FAISS index is empty")
-        return cls(index.d, index)
+        instance = cls(index.d, index)
+        if use_gpu:
+            instance._move_to_gpu()
+        return instance
+
+    def _move_to_gpu(self) -> None:
+        """把只读的查询索引复制到第 0 块 GPU；不可用时（faiss-cpu、无 GPU、HNSW 等）保留在 CPU"""
+        if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+            logger.info("No GPU available for FAISS; searching on CPU")
+            return
+        try:
+            resources = faiss.StandardGpuResources()
+            self.index = faiss.index_cpu_to_gpu(resources, 0, self.index)
+        except Exception as exc:  # pragma: no cover - depends on GPU build
+            logger.warning("Failed to move FAISS index to GPU, searching on CPU: %s", exc)
+            return
+        # GPU 索引依赖 resources 存活，需与索引一起保留
+        self._gpu_resources = resources
+        logger.info("Moved FAISS index with %d vectors to GPU", self.index.ntotal)
 
     def search(self, vectors: np.ndarray, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """整批查询一次 index.search；输入已是连续 float32 时不再复制"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
         if vectors.ndim == 1:
             vectors = vectors.reshape(1, -1)
-        return self.index.search(vectors.astype("float32"), top_k)
+        return self.index.search(vectors, top_k)
+
+
+def _read_flags() -> int:
+    """索引只读查询：支持时以 mmap 方式加载向量数据（Flat/HNSW/IVF 均适用），按需从磁盘分页读入"""
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+    if mmap_flag is None:  # pragma: no cover - faiss < 1.11
+        return 0
+    return mmap_flag | faiss.IO_FLAG_READ_ONLY
 
 
 __all__ = ["FaissIndex"]
@@ -4,12 +4,17 @@ import logging
 import json
 import html
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Tuple
 
 import feedparser
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .models import CandidateWork
 from .settings import Settings
@@ -17,11 +22,32 @@ from .utils import ensure_isoformat, iso_to_datetime, utc_now
 
 logger = logging.getLogger(__name__)
 
+CROSSREF_API = "https://api.crossref.org/works"
+# Crossref 礼貌池（带 mailto）允许的最大并发请求数；两个 Crossref 数据源共用这一上限
+CROSSREF_MAX_CONCURRENCY = 3
+# 期刊定向查询的线程数，不超过 Crossref 并发上限
+TOP_VENUE_WORKERS = CROSSREF_MAX_CONCURRENCY
+
 
 class CandidateFetcher:
     def __init__(self, settings: Settings, base_dir: Path):
         self.settings = settings
         self.session = requests.Session()
+        # Crossref 限流时返回 429：按 Retry-After 退避重试，而不是直接丢弃该期刊
+        self.session.mount(
+            "https://api.crossref.org/",
+            HTTPAdapter(
+                pool_maxsize=CROSSREF_MAX_CONCURRENCY,
+                max_retries=Retry(
+                    total=5,
+                    backoff_factor=1.0,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    raise_on_status=False,
+                ),
+            ),
+        )
+        # 主查询与期刊定向查询并发执行，共用同一个信号量限制在途请求数
+        self._crossref_slots = threading.BoundedSemaphore(CROSSREF_MAX_CONCURRENCY)
         self.base_dir = Path(base_dir)
         self.cache_path = self.base_dir / "data" / "cache" / "candidate_cache.json"
         self.cache_path.parent.mkdir(parents=True, exist_ok=True)
@@ -44,26 +70,41 @@ class CandidateFetcher:
                 "Candidate cache is stale (age %.1f hours); refreshing",
                 age.total_seconds() / 3600,
             )
-        window_days = self.settings.sources.window_days
+        sources = self.settings.sources
+        window_days = sources.window_days
         since = datetime.now(timezone.utc) - timedelta(days=window_days)
-        results: List[CandidateWork] = []
+        tasks: List[Tuple[str, Callable[[], List[CandidateWork]]]] = []
 
-        if self.settings.sources.openalex.enabled:
-            results.extend(self._fetch_openalex(since))
-        if self.settings.sources.crossref.enabled:
-            results.extend(self._fetch_crossref(since))
-            results.extend(self._fetch_crossref_top_venues(since))
-        if self.settings.sources.arxiv.enabled:
-            results.extend(self._fetch_arxiv())
-        if self.settings.sources.biorxiv.enabled:
-            results.extend(self._fetch_biorxiv(window_days))
-        if self.settings.sources.medrxiv.enabled:
-            results.extend(self._fetch_biorxiv(window_days, medrxiv=True))
+        if sources.openalex.enabled:
+            tasks.append(("openalex", partial(self._fetch_openalex, since)))
+        if sources.crossref.enabled:
+            tasks.append(("crossref", partial(self._fetch_crossref, since)))
+            tasks.append(("crossref top venues", partial(self._fetch_crossref_top_venues, since)))
+        if sources.arxiv.enabled:
+            tasks.append(("arxiv", partial(self._fetch_arxiv, since)))
+        if sources.biorxiv.enabled:
+            tasks.append(("biorxiv", partial(self._fetch_biorxiv, window_days)))
+        if sources.medrxiv.enabled:
+            tasks.append(("medrxiv", partial(self._fetch_biorxiv, window_days, medrxiv=True)))
+        results = self._run_fetchers(tasks)
 
         logger.info("Fetched %d candidate works", len(results))
         self._save_cache(results)
         return results
 
+    @staticmethod
+    def _run_fetchers(tasks: List[Tuple[str, Callable[[], List[CandidateWork]]]]) -> List[CandidateWork]:
+        """各数据源互不依赖、耗时主要在网络等待，并发请求；结果仍按数据源顺序合并"""
+        if not tasks:
+            return []
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="fetch") as pool:
+            futures = {pool.submit(fetch): name for name, fetch in tasks}
+            for future in as_completed(futures):
+                if future.exception() is None:
+                    logger.info("Source %s returned %d works", futures[future], len(future.result()))
+            # 任一数据源失败时与串行版本一致：按顺序抛出第一个异常
+            return [work for future in futures for work in future.result()]
+
     def _load_top_venues(self) -> List[str]:
         if not self.profile_path.exists():
             return []
@@ -161,8 +202,11 @@ class CandidateFetcher:
             )
         return results
 
+    def _crossref_get(self, params: dict) -> requests.Response:
+        with self._crossref_slots:
+            return self.session.get(CROSSREF_API, params=params, timeout=30)
+
     def _fetch_crossref(self, since: datetime) -> List[CandidateWork]:
-        url = "https://api.crossref.org/works"
         params = {
             "filter": f"from-pub-date:{since.date().isoformat()}",
             "sort": "created",
@@ -171,7 +215,7 @@ class CandidateFetcher:
             "mailto": self.settings.sources.crossref.mailto,
         }
         logger.info("Fetching Crossref works since %s", since.date())
-        resp = self.session.get(url, params=params, timeout=30)
+        resp = self._crossref_get(params)
         resp.raise_for_status()
         message = resp.json().get("message", {})
         results = []
@@ -204,54 +248,62 @@ class CandidateFetcher:
     def _fetch_crossref_top_venues(self, since: datetime) -> List[CandidateWork]:
         if not self.top_venues:
             return []
+        # 各期刊的查询互相独立，少量并发即可；结果仍按期刊顺序合并
+        with ThreadPoolExecutor(
+            max_workers=min(TOP_VENUE_WORKERS, len(self.top_venues)), thread_name_prefix="crossref-venue"
+        ) as pool:
+            per_venue = list(pool.map(partial(self._fetch_crossref_venue, since=since), self.top_venues))
+        results = [work for works in per_venue for work in works]
+        if results:
+            logger.info("Fetched %d additional works from top venues", len(results))
+        return results
+
+    def _fetch_crossref_venue(self, venue: str, since: datetime) -> List[CandidateWork]:
+        params = {
+            "filter": f"from-pub-date:{since.date().isoformat()},container-title:{venue}",
+            "sort": "created",
+            "order": "desc",
+            "rows": 100,
+            "mailto": self.settings.sources.crossref.mailto,
+        }
+        try:
+            resp = self._crossref_get(params)
+            resp.raise_for_status()
+        except Exception as exc:
+            logger.warning("Failed to fetch Crossref top venue %s: %s", venue, exc)
+            return []
+        message = resp.json().get("message", {})
         results: List[CandidateWork] = []
-        for venue in self.top_venues:
-            params = {
-                "filter": f"from-pub-date:{since.date().isoformat()},container-title:{venue}",
-                "sort": "created",
-                "order": "desc",
-                "rows": 100,
-                "mailto": self.settings.sources.crossref.mailto,
-            }
-            try:
-                resp = self.session.get("https://api.crossref.org/works", params=params, timeout=30)
-                resp.raise_for_status()
-            except Exception as exc:
-                logger.warning("Failed to fetch Crossref top venue %s: %s", venue, exc)
+        for item in message.get("items", []):
+            title = _clean_title((item.get("title") or [""])[0])
+            if not title:
                 continue
-            message = resp.json().get("message", {})
-            for item in message.get("items", []):
-                title = _clean_title((item.get("title") or [""])[0])
-                if not title:
-                    continue
-                doi = item.get("DOI")
-                authors = [
-                    " ".join(filter(None, [p.get("given"), p.get("family")])).strip()
-                    for p in item.get("author", [])
-                ]
-                results.append(
-                    CandidateWork(
-                        source="crossref",
-                        identifier=doi or item.get("URL", "unknown"),
-                        title=title,
-                        abstract=_clean_crossref_abstract(item.get("abstract")),
-                        authors=[a for a in authors if a],
-                        doi=doi,
-                        url=item.get("URL"),
-                        published=_parse_date(item.get("created", {}).get("date-time")),
-                        venue=venue,
-                        metrics={"is-referenced-by": float(item.get("is-referenced-by-count", 0))},
-                        extra={
-                            "source": "top_venue",
-                            "type": item.get("type"),
-                        },
-                    )
+            doi = item.get("DOI")
+            authors = [
+                " ".join(filter(None, [p.get("given"), p.get("family")])).strip()
+                for p in item.get("author", [])
+            ]
+            results.append(
+                CandidateWork(
+                    source="crossref",
+                    identifier=doi or item.get("URL", "unknown"),
+                    title=title,
+                    abstract=_clean_crossref_abstract(item.get("abstract")),
+                    authors=[a for a in authors if a],
+                    doi=doi,
+                    url=item.get("URL"),
+                    published=_parse_date(item.get("created", {}).get("date-time")),
+                    venue=venue,
+                    metrics={"is-referenced-by": float(item.get("is-referenced-by-count", 0))},
+                    extra={
+                        "source": "top_venue",
+                        "type": item.get("type"),
+                    },
                 )
-        if results:
-            logger.info("Fetched %d additional works from top venues", len(results))
+            )
         return results
 
-    def _fetch_arxiv(self) -> List[CandidateWork]:
+    def _fetch_arxiv(self, since: datetime) -> List[CandidateWork]:
         categories = self.settings.sources.arxiv.categories
         query = " OR ".join(f"cat:{cat}" for cat in categories)
         url = "https://export.arxiv.org/api/query"
@@ -272,6 +324,9 @@ class CandidateFetcher:
                 continue
             identifier = entry.get("id")
             published = _parse_date(entry.get("published"))
+            # 结果按提交时间倒序，遇到早于时间窗口的条目即可停止
+            if published and published < since:
+                break
             results.append(
                 CandidateWork(
                     source="arxiv",
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
 import logging
+import queue
+import threading
 import time
 from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Optional, Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None  # type: ignore
+
+from .collections_index import CollectionPathIndex
 from .models import ZoteroItem
 from .settings import Settings
 from .storage import ProfileStorage
@@ -15,6 +25,9 @@ from .utils import hash_content
 logger = logging.getLogger(__name__)
 
 API_BASE = "https://api.zotero.org"
+UPSERT_BATCH_SIZE = 1000
+# 同时打开的分页响应数：消费者正在解析的一页 + 预取的下一页，连接池按此大小配置
+MAX_OPEN_PAGES = 2
 
 
 @dataclass
@@ -25,15 +38,6 @@ class ZoteroCollection:
     parent_key: Optional[str] = None
     children: List["ZoteroCollection"] = field(default_factory=list)
 
-    def full_path(self, all_collections: Dict[str, "ZoteroCollection"]) -> str:
-        """获取分类的完整路径，如 '生物信息/单细胞/scRNA-seq'"""
-        parts = [self.name]
-        current = self
-        while current.parent_key and current.parent_key in all_collections:
-            current = all_collections[current.parent_key]
-            parts.insert(0, current.name)
-        return "/".join(parts)
-
 
 @dataclass
 class IngestStats:
@@ -48,12 +52,25 @@ class ZoteroClient:
     def __init__(self, settings: Settings):
         self.settings = settings
         self.session = requests.Session()
+        # 复用 TLS 连接（预取的下一页占用第二个连接），并对瞬时错误自动退避重试
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=MAX_OPEN_PAGES,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("https://", adapter)
         api_key = settings.zotero.api.api_key()
         self.session.headers.update(
             {
                 "Zotero-API-Version": "3",
                 "Authorization": f"Bearer {api_key}",
                 "User-Agent": "ZotWatcher/0.1",
+                "Accept-Encoding": "gzip",
             }
         )
         self.base_user_url = f"{API_BASE}/users/{settings.zotero.api.user_id}"
@@ -61,6 +78,51 @@ class ZoteroClient:
         self.polite_delay = settings.zotero.api.polite_delay_ms / 1000
 
     def iter_items(self, since_version: Optional[int] = None) -> Iterable[requests.Response]:
+        """按页返回条目响应；后台线程预取下一页，使网络等待与当前页的解析/入库重叠。
+
+        响应以流式读取，消费者处理完一页后才释放一个名额，预取线程最多同时持有
+        MAX_OPEN_PAGES 个未读完的响应，与连接池大小一致。
+        """
+        pages: "queue.Queue[object]" = queue.Queue(maxsize=1)
+        slots = threading.Semaphore(MAX_OPEN_PAGES)
+        stop = threading.Event()
+        worker = threading.Thread(
+            target=self._prefetch_pages,
+            args=(since_version, pages, slots, stop),
+            name="zotero-prefetch",
+            daemon=True,
+        )
+        worker.start()
+        page: object = None
+        try:
+            while True:
+                page = pages.get()
+                if page is _END_OF_PAGES:
+                    return
+                if isinstance(page, BaseException):
+                    raise page
+                yield page
+                page.close()  # type: ignore[attr-defined]
+                page = None
+                slots.release()
+        finally:
+            stop.set()
+            if isinstance(page, requests.Response):
+                page.close()
+            worker.join()
+            # 释放未被消费的预取响应
+            while not pages.empty():
+                leftover = pages.get_nowait()
+                if isinstance(leftover, requests.Response):
+                    leftover.close()
+
+    def _prefetch_pages(
+        self,
+        since_version: Optional[int],
+        pages: "queue.Queue[object]",
+        slots: threading.Semaphore,
+        stop: threading.Event,
+    ) -> None:
         params = {
             "limit": self.settings.zotero.api.page_size,
             "sort": "dateAdded",
@@ -71,18 +133,40 @@ class ZoteroClient:
             headers["If-Modified-Since-Version"] = str(since_version)
 
         next_url = self.base_items_url
-        while next_url:
-            logger.debug("Fetching Zotero page: %s", next_url)
-            resp = self.session.get(next_url, params=params if next_url == self.base_items_url else None, headers=headers)
-            if resp.status_code == 304:
-                logger.info("Zotero API indicated no changes since version %s", since_version)
-                return
-            resp.raise_for_status()
-            yield resp
-            next_url = _parse_next_link(resp.headers.get("Link"))
-            headers = {}
-            params = {}
-            time.sleep(self.polite_delay)
+        last_request = None
+        try:
+            while next_url and not stop.is_set():
+                # 等消费者处理完更早的一页再发请求，避免未读完的响应超过连接池大小
+                if not _acquire_until_stopped(slots, stop):
+                    return
+                # 保证相邻两次请求的发起间隔不小于 polite_delay
+                if last_request is not None:
+                    wait = self.polite_delay - (time.monotonic() - last_request)
+                    if wait > 0 and stop.wait(wait):
+                        return
+                last_request = time.monotonic()
+                logger.debug("Fetching Zotero page: %s", next_url)
+                resp = self.session.get(
+                    next_url,
+                    params=params if next_url == self.base_items_url else None,
+                    headers=headers,
+                    stream=True,
+                )
+                if resp.status_code == 304:
+                    logger.info("Zotero API indicated no changes since version %s", since_version)
+                    resp.close()
+                    break
+                resp.raise_for_status()
+                next_url = _parse_next_link(resp.headers.get("Link"))
+                headers = {}
+                params = {}
+                if not _put_until_stopped(pages, resp, stop):
+                    resp.close()
+                    return
+        except Exception as exc:
+            _put_until_stopped(pages, exc, stop)
+            return
+        _put_until_stopped(pages, _END_OF_PAGES, stop)
 
     def fetch_deleted(self, since_version: Optional[int]) -> List[str]:
         if since_version is None:
@@ -128,6 +212,28 @@ class ZoteroClient:
         return collections
 
 
+_END_OF_PAGES = object()
+
+
+def _acquire_until_stopped(slots: threading.Semaphore, stop: threading.Event) -> bool:
+    """获取一个响应名额；消费者已停止时放弃并返回 False"""
+    while not stop.is_set():
+        if slots.acquire(timeout=0.1):
+            return True
+    return False
+
+
+def _put_until_stopped(pages: "queue.Queue[object]", item: object, stop: threading.Event) -> bool:
+    """放入队列；消费者已停止时放弃并返回 False"""
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
 def _parse_next_link(link_header: Optional[str]) -> Optional[str]:
     if not link_header:
         return None
@@ -140,12 +246,13 @@ def _parse_next_link(link_header: Optional[str]) -> Optional[str]:
     return None
 
 
-def _get_all_descendant_ids(collection: ZoteroCollection) -> Set[str]:
-    """递归获取分类及其所有子分类的 ID"""
-    result = {collection.key}
-    for child in collection.children:
-        result.update(_get_all_descendant_ids(child))
-    return result
+def _iter_response_items(resp: requests.Response) -> Iterable[Dict[str, object]]:
+    """逐条解析分页响应中的条目；未安装 ijson 时退回一次性 resp.json()"""
+    if ijson is None:
+        yield from resp.json()
+        return
+    resp.raw.decode_content = True
+    yield from ijson.items(resp.raw, "item", use_float=True)
 
 
 class CollectionFilter:
@@ -157,6 +264,9 @@ class CollectionFilter:
         self.filter_config = settings.zotero.collections
         self._allowed_ids: Optional[Set[str]] = None
 
+        # 预先构建路径/名称/父子关系索引，避免每次查询都遍历全部分类
+        self._path_index = CollectionPathIndex.from_collections(collections)
+
     def _resolve_allowed_ids(self) -> Set[str]:
         """解析配置，返回所有允许的分类 ID 集合"""
         if self._allowed_ids is not None:
@@ -172,9 +282,8 @@ class CollectionFilter:
         # 处理按 ID 配置的分类
         for coll_id in self.filter_config.ids:
             if coll_id in self.collections:
-                coll = self.collections[coll_id]
                 if self.filter_config.include_children:
-                    allowed.update(_get_all_descendant_ids(coll))
+                    allowed.update(self._path_index.descendants(coll_id))
                 else:
                     allowed.add(coll_id)
             else:
@@ -185,7 +294,7 @@ class CollectionFilter:
             matched = self._find_collection_by_path(name_path)
             if matched:
                 if self.filter_config.include_children:
-                    allowed.update(_get_all_descendant_ids(matched))
+                    allowed.update(self._path_index.descendants(matched.key))
                 else:
                     allowed.add(matched.key)
             else:
@@ -198,32 +307,15 @@ class CollectionFilter:
     def _find_collection_by_path(self, path: str) -> Optional[ZoteroCollection]:
         """按路径查找分类，如 '生物信息/单细胞'"""
         parts = [p.strip() for p in path.split("/") if p.strip()]
-        if not parts:
-            return None
-
-        # 查找所有匹配最后一个名称的分类
-        target_name = parts[-1]
-        candidates = [c for c in self.collections.values() if c.name == target_name]
-
-        if len(parts) == 1:
+        if len(parts) == 1 and len(self._path_index.keys_by_name(parts[0])) > 1:
             # 只指定了名称，返回第一个匹配的（如果有多个同名分类，可能需要改进）
-            if candidates:
-                if len(candidates) > 1:
-                    logger.warning(
-                        "Multiple collections named '%s' found, using first match. "
-                        "Consider using full path like 'Parent/Child' to be specific.",
-                        target_name
-                    )
-                return candidates[0]
-            return None
-
-        # 验证完整路径
-        for coll in candidates:
-            full_path = coll.full_path(self.collections)
-            if full_path == path or full_path.endswith("/" + path):
-                return coll
-
-        return None
+            logger.warning(
+                "Multiple collections named '%s' found, using first match. "
+                "Consider using full path like 'Parent/Child' to be specific.",
+                parts[0]
+            )
+        key = self._path_index.resolve(path)
+        return self.collections.get(key) if key else None
 
     def should_include_item(self, item: ZoteroItem) -> bool:
         """判断条目是否应该被包含（基于分类过滤）"""
@@ -240,6 +332,15 @@ class CollectionFilter:
         return False
 
 
+def _content_hash(item: ZoteroItem) -> str:
+    """计算条目内容哈希。
+
+    增量同步时服务端已按版本过滤，但哈希仍是 embedding 缓存键
+    （见 ProfileBuilder），因此不能省略。
+    """
+    return hash_content(item.title, item.abstract or "", item.creators, item.tags)
+
+
 class ZoteroIngestor:
     def __init__(self, storage: ProfileStorage, settings: Settings):
         self.storage = storage
@@ -265,11 +366,11 @@ class ZoteroIngestor:
             logger.info("Full sync with collection filter: clearing existing items")
             self.storage.clear_all_items()
 
+        pending: List[Tuple[ZoteroItem, str]] = []
         for response in self.client.iter_items(since_version=since_version):
-            items = response.json()
             response_version = int(response.headers.get("Last-Modified-Version", 0))
             max_version = max(max_version, response_version)
-            for raw_item in items:
+            for raw_item in _iter_response_items(response):
                 zot_item = ZoteroItem.from_zotero_api(raw_item)
 
                 # 应用分类过滤
@@ -277,15 +378,14 @@ class ZoteroIngestor:
                     stats.filtered += 1
                     continue
 
-                content_hash = hash_content(
-                    zot_item.title,
-                    zot_item.abstract or "",
-                    ",".join(zot_item.creators),
-                    ",".join(zot_item.tags),
-                )
-                self.storage.upsert_item(zot_item, content_hash=content_hash)
+                pending.append((zot_item, _content_hash(zot_item)))
                 stats.fetched += 1
                 stats.updated += 1
+                if len(pending) >= UPSERT_BATCH_SIZE:
+                    self.storage.upsert_items(pending)
+                    pending = []
+        if pending:
+            self.storage.upsert_items(pending)
 
         deleted_keys = self.client.fetch_deleted(since_version=max_version if not full else None)
         self.storage.remove_items(deleted_keys)
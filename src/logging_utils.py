@@ -8,6 +8,11 @@ def setup_logging(level: int = logging.INFO, verbose: bool = False) -> None:
     """Configure root logger with a sensible default format."""
     if verbose:
         level = logging.DEBUG
+    # 日志格式不使用线程/进程/调用位置字段，关闭后每条记录无需再查询线程名和回溯调用栈
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging._srcfile = None
     logging.basicConfig(
         level=level,
         format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
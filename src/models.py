@@ -4,7 +4,9 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Dict, Iterable, List, Optional, Sequence
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from .utils import json_dumps_bytes, json_loads
 
 
 class ZoteroItem(BaseModel):
@@ -18,7 +20,33 @@ class ZoteroItem(BaseModel):
     year: Optional[int] = None
     doi: Optional[str] = None
     url: Optional[str] = None
-    raw: Dict[str, object] = Field(default_factory=dict)
+
+    # raw 体积最大且多数调用方用不到，从数据库读取时只保留 JSON 文本，首次访问再解析
+    _raw: Optional[Dict[str, object]] = PrivateAttr(default=None)
+    _raw_json: Optional[str] = PrivateAttr(default=None)
+
+    def __init__(
+        self,
+        raw: Optional[Dict[str, object]] = None,
+        raw_json: Optional[str] = None,
+        **data: object,
+    ) -> None:
+        super().__init__(**data)
+        self._raw = raw
+        self._raw_json = raw_json
+
+    @property
+    def raw(self) -> Dict[str, object]:
+        if self._raw is None:
+            self._raw = json_loads(self._raw_json) if self._raw_json else {}
+            self._raw_json = None
+        return self._raw
+
+    def raw_json(self) -> str:
+        """返回 raw 的 JSON 文本；尚未解析时直接复用原文本"""
+        if self._raw is None and self._raw_json is not None:
+            return self._raw_json
+        return json_dumps_bytes(self.raw, sort_keys=False).decode("utf-8")
 
     def content_for_embedding(self) -> str:
         parts = [self.title]
@@ -3,7 +3,7 @@ from __future__ import annotations
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from jinja2 import Environment, Template
 
@@ -48,13 +48,24 @@ _TEMPLATE = """
 """
 
 
+# 模板只编译一次，进程内重复生成报告时复用
+_COMPILED_TEMPLATE: Optional[Template] = None
+
+
+def _get_template() -> Template:
+    global _COMPILED_TEMPLATE
+    if _COMPILED_TEMPLATE is None:
+        _COMPILED_TEMPLATE = Environment(autoescape=True).from_string(_TEMPLATE)
+    return _COMPILED_TEMPLATE
+
+
 def render_html(works: List[RankedWork], output_path: Path | str) -> Path:
-    env = Environment(autoescape=True)
-    template: Template = env.from_string(_TEMPLATE)
-    rendered = template.render(works=works, generated_at=datetime.utcnow().isoformat())
     path = Path(output_path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(rendered, encoding="utf-8")
+    # 逐段渲染并写入文件，不在内存中拼出整篇报告
+    stream = _get_template().stream(works=works, generated_at=datetime.utcnow().isoformat())
+    stream.enable_buffering(64)
+    stream.dump(str(path), encoding="utf-8")
     logger.info("Wrote HTML report to %s", path)
     return path
 
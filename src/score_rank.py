@@ -1,18 +1,18 @@
 from __future__ import annotations
 
 import csv
-import json
 import logging
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 import numpy as np
 
 from .faiss_store import FaissIndex
 from .models import CandidateWork, RankedWork
 from .settings import Settings
+from .utils import json_loads
 from .vectorizer import TextVectorizer
 
 logger = logging.getLogger(__name__)
@@ -28,20 +28,26 @@ class WorkRanker:
     def __init__(self, base_dir: Path | str, settings: Settings, vectorizer: TextVectorizer | None = None):
         self.base_dir = Path(base_dir)
         self.settings = settings
-        self.vectorizer = vectorizer or TextVectorizer()
+        # 候选向量必须与画像使用同一后端编码
+        self.vectorizer = vectorizer or TextVectorizer(
+            backend=settings.encode_backend, cache_dir=self.base_dir / "data" / "models"
+        )
         self.artifacts = RankerArtifacts(
             index_path=self.base_dir / "data" / "faiss.index",
             profile_path=self.base_dir / "data" / "profile.json",
         )
-        self.index = FaissIndex.load(self.artifacts.index_path)
+        self.index = FaissIndex.load(self.artifacts.index_path, use_gpu=settings.faiss_use_gpu)
         self.profile = self._load_profile()
         self.journal_metrics = self._load_journal_metrics()
+        # 白名单在构造时统一转小写，打分时每个候选只做集合查找
+        self._whitelist_authors = frozenset(a.lower() for a in settings.scoring.whitelist_authors)
+        self._whitelist_venues = frozenset(v.lower() for v in settings.scoring.whitelist_venues)
 
     def _load_profile(self) -> dict:
         path = self.artifacts.profile_path
         if not path.exists():
             raise FileNotFoundError("Profile JSON not found; run profile build first.")
-        return json.loads(path.read_text(encoding="utf-8"))
+        return json_loads(path.read_bytes())
 
     def _load_journal_metrics(self) -> Dict[str, float]:
         path = self.base_dir / "data" / "journal_metrics.csv"
@@ -71,45 +77,65 @@ class WorkRanker:
         if not candidates:
             return []
 
+        # 所有候选一次性批量编码，批大小与画像构建共用配置
         texts = [c.content_for_embedding() for c in candidates]
-        vectors = self.vectorizer.encode(texts)
+        vectors = self.vectorizer.encode(texts, batch_size=self.settings.encode_batch_size)
         logger.info("Scoring %d candidate works", len(candidates))
 
-        distances, _ = self.index.search(vectors, top_k=1)
+        distances, indices = self.index.search(vectors, top_k=1)
+        # 没有近邻时（空索引或 IVF 探测的簇为空）FAISS 返回 -1 与极小距离，按相似度 0 处理
+        similarities = np.where(indices[:, 0] >= 0, distances[:, 0], 0.0)
+        # 权重与阈值在循环外取成局部变量，逐条打分时不再重复属性查找
         weights = self.settings.scoring.weights
+        w_similarity = weights.similarity
+        w_recency = weights.recency
+        w_citations = weights.citations
+        w_altmetric = weights.altmetric
+        w_journal_quality = getattr(weights, "journal_quality", 0.0)
+        w_author_bonus = weights.author_bonus
+        w_venue_bonus = weights.venue_bonus
         thresholds = self.settings.scoring.thresholds
+        must_read_threshold = thresholds.must_read
+        consider_threshold = thresholds.consider
+        whitelist_authors = self._whitelist_authors
+        whitelist_venues = self._whitelist_venues
+        journal_metrics = self.journal_metrics
+
+        recency_scores = _compute_recencies([c.published for c in candidates], self.settings)
 
         ranked: List[RankedWork] = []
-        for candidate, vector, distance in zip(candidates, vectors, distances):
-            similarity = float(distance[0]) if distance.size else 0.0
-            recency_score = _compute_recency(candidate.published, self.settings)
+        scores: List[float] = []
+        for candidate, similarity, recency_score in zip(
+            candidates, similarities.tolist(), recency_scores.tolist()
+        ):
             citation_score, altmetric_score = _compute_metric(candidate)
-            journal_quality, journal_sjr = _journal_quality_score(candidate.venue, self.journal_metrics)
-            author_bonus = _bonus(candidate.authors, self.settings.scoring.whitelist_authors)
-            venue_bonus = _bonus(
-                [candidate.venue] if candidate.venue else [],
-                self.settings.scoring.whitelist_venues,
-            )
+            # 期刊指标与期刊白名单共用同一个小写 venue
+            venue_lower = candidate.venue.lower() if candidate.venue else None
+            journal_quality, journal_sjr = _journal_quality_score(venue_lower, journal_metrics)
+            author_bonus = _bonus(candidate.authors, whitelist_authors)
+            venue_bonus = 1.0 if venue_lower and venue_lower in whitelist_venues else 0.0
 
             score = (
-                similarity * weights.similarity
-                + recency_score * weights.recency
-                + citation_score * weights.citations
-                + altmetric_score * weights.altmetric
-                + journal_quality * getattr(weights, "journal_quality", 0.0)
-                + author_bonus * weights.author_bonus
-                + venue_bonus * weights.venue_bonus
+                similarity * w_similarity
+                + recency_score * w_recency
+                + citation_score * w_citations
+                + altmetric_score * w_altmetric
+                + journal_quality * w_journal_quality
+                + author_bonus * w_author_bonus
+                + venue_bonus * w_venue_bonus
             )
 
+            scores.append(score)
             label = "ignore"
-            if score >= thresholds.must_read:
+            if score >= must_read_threshold:
                 label = "must_read"
-            elif score >= thresholds.consider:
+            elif score >= consider_threshold:
                 label = "consider"
 
+            # 候选字段已在抓取时校验（日期已解析为 datetime），直接构造，避免逐条重新校验与深拷贝
             ranked.append(
-                RankedWork(
-                    **candidate.dict(),
+                RankedWork.model_construct(
+                    **dict(candidate),
                     score=score,
                     similarity=similarity,
                     recency_score=recency_score,
@@ -121,22 +147,25 @@ class WorkRanker:
                     label=label,
                 )
             )
-        ranked.sort(key=lambda w: w.score, reverse=True)
-        return ranked
+        # 下游还要按时间和预印本比例过滤，不能只取前 N；用 numpy 稳定排序代替逐对象 key 排序，
+        # 同分时保持原有顺序
+        order = np.argsort(-np.asarray(scores, dtype=np.float64), kind="stable")
+        return [ranked[i] for i in order.tolist()]
 
 
-def _bonus(values: List[str], whitelist: List[str]) -> float:
-    whitelist_lower = {v.lower() for v in whitelist}
+def _bonus(values: List[str], whitelist_lower: FrozenSet[str]) -> float:
+    if not whitelist_lower:
+        return 0.0
     for value in values:
         if value and value.lower() in whitelist_lower:
             return 1.0
     return 0.0
 
 
-def _journal_quality_score(venue: Optional[str], metrics: Dict[str, float]) -> Tuple[float, Optional[float]]:
-    if not venue:
+def _journal_quality_score(venue_lower: Optional[str], metrics: Dict[str, float]) -> Tuple[float, Optional[float]]:
+    if not venue_lower:
         return 1.0, None
-    key = venue.strip().lower()
+    key = venue_lower.strip()
     value = metrics.get(key)
     if value is None:
         return 1.0, None
@@ -146,21 +175,28 @@ def _journal_quality_score(venue: Optional[str], metrics: Dict[str, float]) -> T
     return score, float(value)
 
 
-def _compute_recency(published: datetime | None, settings: Settings) -> float:
-    if not published:
-        return 0.0
-    if published.tzinfo is None:
-        published = published.replace(tzinfo=timezone.utc)
+def _compute_recencies(published: List[datetime | None], settings: Settings) -> np.ndarray:
+    """按发表距今天数分档计算时效分，整批向量化，当前时间只取一次；无日期记 0"""
     now = datetime.now(timezone.utc)
-    delta_days = max((now - published).days, 0)
+    days = np.array(
+        [
+            max((now - (p if p.tzinfo else p.replace(tzinfo=timezone.utc))).days, 0) if p else -1
+            for p in published
+        ],
+        dtype=np.int64,
+    )
     decay = settings.scoring.decay_days
-    if delta_days <= decay.get("fast", 30):
-        return 1.0
-    if delta_days <= decay.get("medium", 60):
-        return 0.7
-    if delta_days <= decay.get("slow", 180):
-        return 0.4
-    return 0.1
+    scores = np.select(
+        [
+            days < 0,
+            days <= decay.get("fast", 30),
+            days <= decay.get("medium", 60),
+            days <= decay.get("slow", 180),
+        ],
+        [0.0, 1.0, 0.7, 0.4],
+        default=0.1,
+    )
+    return scores
 
 
 def _compute_metric(candidate: CandidateWork) -> Tuple[float, float]:
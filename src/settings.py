@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 import os
+import re
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional, Union
 
 import yaml
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, NonNegativeInt, PositiveInt, StrictBool, validator
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # pragma: no cover - PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader  # type: ignore
 
 
 class ZoteroApiConfig(BaseModel):
@@ -128,6 +134,52 @@ class Settings(BaseModel):
     zotero: ZoteroConfig
     sources: SourcesConfig
     scoring: ScoringConfig
+    encode_batch_size: PositiveInt = 128
+    # True 使用全部 CPU 核，整数为进程数（0/1 即不启用多进程）
+    encode_parallel: Union[StrictBool, NonNegativeInt] = False
+    encode_backend: Literal["torch", "onnx-int8"] = "torch"
+    faiss_use_gpu: bool = False
+
+
+# 编码与索引的运行参数由环境变量（或 .env）覆盖，未设置时使用 Settings 的默认值
+_RUNTIME_ENV_VARS = {
+    "encode_batch_size": "ZOTWATCHER_ENCODE_BATCH_SIZE",
+    "encode_parallel": "ZOTWATCHER_ENCODE_PARALLEL",
+    "encode_backend": "ZOTWATCHER_ENCODE_BACKEND",
+    "faiss_use_gpu": "ZOTWATCHER_FAISS_USE_GPU",
+}
+
+
+_TRUE_WORDS = {"true", "yes", "on"}
+_FALSE_WORDS = {"false", "no", "off"}
+
+
+def _runtime_overrides() -> Dict[str, Any]:
+    """读取已设置的运行参数环境变量，校验交给 Settings"""
+    overrides: Dict[str, Any] = {}
+    for field, env_var in _RUNTIME_ENV_VARS.items():
+        value = os.getenv(env_var, "").strip()
+        if not value:
+            continue
+        if field == "encode_parallel":
+            value = _parse_parallel(env_var, value)
+        overrides[field] = value
+    return overrides
+
+
+def _parse_parallel(env_var: str, value: str) -> Union[bool, int]:
+    """true/false 等词解析为布尔值，其余按进程数解析；避免 "1" 被当作 True（全部核）"""
+    lowered = value.lower()
+    if lowered in _TRUE_WORDS:
+        return True
+    if lowered in _FALSE_WORDS:
+        return False
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(
+            f"{env_var} must be true/false or a worker count, got '{value}'"
+        ) from None
 
 
 
@@ -138,29 +190,60 @@ def _expand_env_vars(data: Any) -> Any:
     if isinstance(data, list):
         return [_expand_env_vars(item) for item in data]
     if isinstance(data, str):
-        return os.path.expandvars(data)
+        if "$" not in data:
+            return data
+        return _ENV_VAR_RE.sub(_substitute_env_var, data)
     return data
 
+
+# 与 os.path.expandvars 相同的 $NAME / ${NAME} 语法，模块级编译一次
+_ENV_VAR_RE = re.compile(r"\$(\w+|\{[^}]*\})", re.ASCII)
+
+
+def _substitute_env_var(match: re.Match) -> str:
+    name = match.group(1)
+    if name.startswith("{"):
+        name = name[1:-1]
+    # 未设置的变量保持原样
+    return os.environ.get(name, match.group(0))
+
+
 def _load_yaml(path: Path) -> Dict[str, Any]:
-    if not path.exists():
-        raise FileNotFoundError(f"Configuration file not found: {path}")
-    with path.open("r", encoding="utf-8") as fh:
-        data = yaml.safe_load(fh) or {}
+    content = path.read_bytes().decode("utf-8")
+    data = yaml.load(content, Loader=_YamlLoader) or {}
     data = _expand_env_vars(data)
     if not isinstance(data, dict):
         raise ValueError(f"Configuration file {path} must contain a mapping at the top level.")
     return data
 
 
+def _scan_config_dir(config_dir: Path) -> Dict[str, Path]:
+    """一次 scandir 列出配置目录中的 *.yaml，返回 {文件名去后缀: 路径}"""
+    try:
+        with os.scandir(config_dir) as entries:
+            return {
+                entry.name[:-5]: Path(entry.path)
+                for entry in entries
+                if entry.name.endswith(".yaml") and entry.is_file()
+            }
+    except FileNotFoundError:
+        return {}
+
+
 def load_settings(base_dir: Path | str) -> Settings:
-    base = Path(base_dir)
-    zotero_cfg = _load_yaml(base / "config" / "zotero.yaml")
-    sources_cfg = _load_yaml(base / "config" / "sources.yaml")
-    scoring_cfg = _load_yaml(base / "config" / "scoring.yaml")
+    config_dir = Path(base_dir) / "config"
+    found = _scan_config_dir(config_dir)
+    configs: Dict[str, Dict[str, Any]] = {}
+    for name in ("zotero", "sources", "scoring"):
+        path = found.get(name)
+        if path is None:
+            raise FileNotFoundError(f"Configuration file not found: {config_dir / f'{name}.yaml'}")
+        configs[name] = _load_yaml(path)
     return Settings(
-        zotero=ZoteroConfig(**zotero_cfg),
-        sources=SourcesConfig(**sources_cfg),
-        scoring=ScoringConfig(**scoring_cfg),
+        zotero=ZoteroConfig(**configs["zotero"]),
+        sources=SourcesConfig(**configs["sources"]),
+        scoring=ScoringConfig(**configs["scoring"]),
+        **_runtime_overrides(),
     )
 
 
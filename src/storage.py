@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-import json
+import itertools
+import os
 import sqlite3
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
 
 from .models import ZoteroItem
+from .utils import json_dumps_bytes, json_loads
+
+# numpy 只在读写 embedding 时按需导入，CLI 的 --help、list-collections 等命令无需加载
+if TYPE_CHECKING:
+    import numpy as np
 
 
 SCHEMA = """
@@ -23,6 +29,9 @@ CREATE TABLE IF NOT EXISTS items (
     raw_json TEXT NOT NULL,
     content_hash TEXT,
     embedding BLOB,
+    embedding_scale REAL,
+    embedding_hash TEXT,
+    emb_idx INTEGER,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -38,24 +47,91 @@ CREATE TABLE IF NOT EXISTS zotero_collections (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE IF NOT EXISTS item_collections (
+    item_key TEXT NOT NULL,
+    coll_key TEXT NOT NULL,
+    PRIMARY KEY (item_key, coll_key)
+);
+
+-- 已删除条目在侧车文件中留下的空行，写入新 embedding 时优先复用
+CREATE TABLE IF NOT EXISTS free_emb_slots (
+    idx INTEGER PRIMARY KEY
+);
+
 CREATE INDEX IF NOT EXISTS idx_items_version ON items(version);
+CREATE INDEX IF NOT EXISTS idx_ic_coll ON item_collections(coll_key);
+-- 部分索引：只包含尚未生成 embedding 的条目，补算时按 updated_at 顺序扫描无需排序
+CREATE INDEX IF NOT EXISTS idx_items_no_emb ON items(updated_at)
+    WHERE embedding IS NULL AND emb_idx IS NULL;
 CREATE INDEX IF NOT EXISTS idx_collections_parent ON zotero_collections(parent_key);
 """
 
 
+# 当前表结构版本，记录在 metadata 表中；修改 SCHEMA 或 _ADDED_COLUMNS 时需要递增
+SCHEMA_VERSION = 2
+
+
+# 在 version 列之后新增的列，已有数据库的 items 表通过 ALTER TABLE 补齐
+_ADDED_COLUMNS = {
+    "embedding_scale": "REAL",
+    "embedding_hash": "TEXT",
+    "emb_idx": "INTEGER",
+}
+
+# 侧车文件中向量的维度与存储精度记录在 metadata 表里
+_EMBEDDING_DIM_KEY = "embedding_dim"
+_EMBEDDING_DTYPE_KEY = "embedding_dtype"
+
+# 侧车文件的存储精度，可用环境变量 ZOTWATCHER_EMBEDDING_DTYPE 切换（便于对比精度）：
+# int8 每行另存 scale（体积 1/4），float16 体积减半，float32 不做量化
+_EMBEDDING_DTYPES = ("int8", "float16", "float32")
+DEFAULT_EMBEDDING_DTYPE = "int8"
+
+
 class ProfileStorage:
     def __init__(self, path: Path | str):
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        # embedding 存放在与数据库同目录的侧车文件中，第 emb_idx 行为对应条目的 float32 向量
+        self.embeddings_path = self.path.with_suffix(".embeddings.bin")
+        self.embedding_dtype = os.getenv("ZOTWATCHER_EMBEDDING_DTYPE") or DEFAULT_EMBEDDING_DTYPE
+        if self.embedding_dtype not in _EMBEDDING_DTYPES:
+            raise ValueError(
+                f"Unsupported embedding dtype '{self.embedding_dtype}'. "
+                f"Allowed: {sorted(_EMBEDDING_DTYPES)}"
+            )
         self._conn: Optional[sqlite3.Connection] = None
 
     def connect(self) -> sqlite3.Connection:
+        """打开（并缓存）连接，同时设置写入/读取相关的 PRAGMA。
+
+        - journal_mode=WAL：提交变为顺序追加，读写互不阻塞；会额外生成 -wal/-shm 文件。
+        - synchronous=NORMAL：WAL 下仅在 checkpoint 时 fsync，断电可能丢失最近的提交，
+          但不会损坏数据库。设置环境变量 ZOTWATCHER_SQLITE_SYNC_OFF=1 可改用 OFF
+          （仅建议用于 CI 等可丢弃的环境）。
+        - temp_store=MEMORY / cache_size=64MB / mmap_size=256MB：以内存换取更少的 I/O。
+        - busy_timeout=5000：遇到锁时最多等待 5 秒而不是立即报错。
+        """
         if self._conn is None:
             self._conn = sqlite3.connect(str(self.path))
             self._conn.row_factory = sqlite3.Row
+            synchronous = "OFF" if os.getenv("ZOTWATCHER_SQLITE_SYNC_OFF") == "1" else "NORMAL"
+            self._conn.executescript(
+                f"""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous={synchronous};
+                PRAGMA temp_store=MEMORY;
+                PRAGMA cache_size=-65536;
+                PRAGMA mmap_size=268435456;
+                PRAGMA busy_timeout=5000;
+                """
+            )
         return self._conn
 
     def initialize(self) -> None:
+        # 表结构已是最新版本时跳过下面的探测与迁移
+        if self._schema_version() == SCHEMA_VERSION:
+            return
         conn = self.connect()
         
         # Check if we need to migrate from old schema
@@ -116,12 +192,16 @@ class ProfileStorage:
                         conn.execute("DROP TABLE items_old")
                         logging.info("Database migration completed successfully")
                     except sqlite3.Error as migrate_error:
-                        logging.error(f"Migration failed: {migrate_error}")
+                        logging.error("Migration failed: %s", migrate_error)
                         logging.warning("Dropping old data and starting fresh")
                         # If migration fails, just drop old table and start fresh
                         conn.execute("DROP TABLE IF EXISTS items_old")
                 else:
-                    # New schema already exists, just ensure all tables are created
+                    # New schema already exists: add new columns first (indexes may use them),
+                    # then ensure all tables are created
+                    for column, column_type in _ADDED_COLUMNS.items():
+                        if column not in columns:
+                            conn.execute(f"ALTER TABLE items ADD COLUMN {column} {column_type}")
                     conn.executescript(SCHEMA)
             else:
                 # No table exists, create from scratch
@@ -130,7 +210,7 @@ class ProfileStorage:
         except sqlite3.Error as e:
             # If any error occurs, try to create schema from scratch
             import logging
-            logging.error(f"Error during database initialization: {e}")
+            logging.error("Error during database initialization: %s", e)
             logging.info("Creating schema from scratch...")
             # Drop any problematic tables
             try:
@@ -141,6 +221,29 @@ class ProfileStorage:
             conn.executescript(SCHEMA)
         
         conn.commit()
+        self._backfill_item_collections()
+        self.set_metadata("schema_version", str(SCHEMA_VERSION))
+
+    def _schema_version(self) -> Optional[int]:
+        try:
+            value = self.get_metadata("schema_version")
+        except sqlite3.OperationalError:
+            # 全新数据库还没有 metadata 表
+            return None
+        return int(value) if value else None
+
+    def _backfill_item_collections(self) -> None:
+        """旧数据库没有 item_collections 表，从 items.collections 一次性补齐"""
+        conn = self.connect()
+        if conn.execute("SELECT 1 FROM item_collections LIMIT 1").fetchone():
+            return
+        with conn:
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO item_collections(item_key, coll_key)
+                SELECT items.key, ic.value FROM items, json_each(items.collections) AS ic
+                """
+            )
 
     def close(self) -> None:
         if self._conn is not None:
@@ -154,11 +257,9 @@ class ProfileStorage:
         return row["value"] if row else None
 
     def set_metadata(self, key: str, value: str) -> None:
-        self.connect().execute(
-            "REPLACE INTO metadata(key, value) VALUES(?, ?)",
-            (key, value),
-        )
-        self.connect().commit()
+        conn = self.connect()
+        with conn:
+            conn.execute("REPLACE INTO metadata(key, value) VALUES(?, ?)", (key, value))
 
     def last_modified_version(self) -> Optional[int]:
         value = self.get_metadata("last_modified_version")
@@ -169,104 +270,273 @@ class ProfileStorage:
 
     # item helpers
     def upsert_item(self, item: ZoteroItem, content_hash: Optional[str] = None) -> None:
-        data = (
-            item.key,
-            item.version,
-            item.title,
-            item.abstract,
-            json.dumps(item.creators),
-            json.dumps(item.tags),
-            json.dumps(item.collections),
-            item.year,
-            item.doi,
-            item.url,
-            json.dumps(item.raw),
-            content_hash,
-        )
-        self.connect().execute(
-            """
-            INSERT INTO items(
-                key, version, title, abstract, creators, tags, collections, year, doi, url, raw_json, content_hash
-            ) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(key) DO UPDATE SET
-                version=excluded.version,
-                title=excluded.title,
-                abstract=excluded.abstract,
-                creators=excluded.creators,
-                tags=excluded.tags,
-                collections=excluded.collections,
-                year=excluded.year,
-                doi=excluded.doi,
-                url=excluded.url,
-                raw_json=excluded.raw_json,
-                content_hash=excluded.content_hash,
-                updated_at=CURRENT_TIMESTAMP
-            """,
-            data,
-        )
-        self.connect().commit()
+        self.upsert_items([(item, content_hash)])
+
+    def upsert_items(self, items: Iterable[Tuple[ZoteroItem, Optional[str]]]) -> None:
+        """在单个事务中批量写入条目，items 为 (ZoteroItem, content_hash)"""
+        items = list(items)
+        conn = self.connect()
+        with conn:
+            conn.executemany(
+                _UPSERT_ITEM_SQL,
+                (_item_to_row(item, content_hash) for item, content_hash in items),
+            )
+            conn.executemany(
+                "DELETE FROM item_collections WHERE item_key = ?",
+                ((item.key,) for item, _ in items),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO item_collections(item_key, coll_key) VALUES(?, ?)",
+                ((item.key, coll_key) for item, _ in items for coll_key in item.collections),
+            )
 
     def remove_items(self, keys: Iterable[str]) -> None:
-        keys = list(keys)
-        if not keys:
+        # 逐条复用同一预编译语句，不受 SQLite 参数个数上限限制
+        rows = [(key,) for key in keys]
+        if not rows:
             return
-        placeholders = ",".join("?" for _ in keys)
-        self.connect().execute(f"DELETE FROM items WHERE key IN ({placeholders})", keys)
-        self.connect().commit()
+        conn = self.connect()
+        with conn:
+            # 回收被删除条目在侧车文件中的行号
+            conn.executemany(
+                "INSERT OR IGNORE INTO free_emb_slots(idx) "
+                "SELECT emb_idx FROM items WHERE key = ? AND emb_idx IS NOT NULL",
+                rows,
+            )
+            conn.executemany("DELETE FROM items WHERE key = ?", rows)
+            conn.executemany("DELETE FROM item_collections WHERE item_key = ?", rows)
 
     def clear_all_items(self) -> None:
         """清空所有条目（用于全量同步时重建）"""
         conn = self.connect()
-        conn.execute("DELETE FROM items")
-        conn.commit()
+        with conn:
+            conn.execute("DELETE FROM items")
+            conn.execute("DELETE FROM item_collections")
+            conn.execute("DELETE FROM free_emb_slots")
+        if self.embeddings_path.exists():
+            _replace_with_empty_file(self.embeddings_path)
+
+    def set_embedding(self, key: str, vector: np.ndarray, embedding_hash: Optional[str] = None) -> None:
+        self.set_embeddings_bulk([(key, vector, embedding_hash)])
+
+    def set_embeddings_bulk(self, rows: Iterable[Tuple[str, np.ndarray, Optional[str]]]) -> None:
+        """批量写入 embedding，rows 为 (key, float32 向量, embedding_hash)。
 
-    def set_embedding(self, key: str, vector: bytes) -> None:
-        self.connect().execute(
-            "UPDATE items SET embedding = ?, updated_at=CURRENT_TIMESTAMP WHERE key = ?",
-            (vector, key),
+        向量按 embedding_dtype 写入侧车文件：已有行号的条目原位覆盖，其余优先复用已删除
+        条目留下的空行，不足时追加到文件末尾；SQLite 中只在单个事务里更新 emb_idx、
+        embedding_scale 与 embedding_hash。
+        """
+        import numpy as np
+
+        rows = [
+            (key, np.ascontiguousarray(vector, dtype=np.float32).reshape(-1), embedding_hash)
+            for key, vector, embedding_hash in rows
+        ]
+        if not rows:
+            return
+        dim = rows[0][1].shape[0]
+        self._ensure_embedding_file(dim)
+        conn = self.connect()
+        dtype = np.dtype(self.embedding_dtype)
+        row_bytes = dim * dtype.itemsize
+        # 一次查询取出整批条目的现有行号；不存在的条目跳过
+        slots = dict(
+            conn.execute(
+                "SELECT key, emb_idx FROM items WHERE key IN (SELECT value FROM json_each(?))",
+                (_dumps([key for key, _, _ in rows]),),
+            ).fetchall()
         )
-        self.connect().commit()
+        missing = [key for key, idx in slots.items() if idx is None]
+        reused: List[int] = []
+        if missing:
+            reused = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT idx FROM free_emb_slots ORDER BY idx LIMIT ?", (len(missing),)
+                )
+            ]
+        updates = []
+        with self.embeddings_path.open("r+b") as fh:
+            next_idx = fh.seek(0, os.SEEK_END) // row_bytes
+            new_slots = itertools.chain(reused, itertools.count(next_idx))
+            slots.update(zip(missing, new_slots))
+            for key, vector, embedding_hash in rows:
+                if key not in slots:
+                    continue
+                idx = slots[key]
+                if dtype == np.int8:
+                    data, scale = quantize_i8(vector)
+                else:
+                    data, scale = vector.astype(dtype).tobytes(), None
+                fh.seek(idx * row_bytes)
+                fh.write(data)
+                updates.append((idx, scale, embedding_hash, key))
+        with conn:
+            conn.executemany("DELETE FROM free_emb_slots WHERE idx = ?", ((idx,) for idx in reused))
+            conn.executemany(
+                "UPDATE items SET emb_idx = ?, embedding = NULL, embedding_scale = ?, "
+                "embedding_hash = ?, updated_at=CURRENT_TIMESTAMP WHERE key = ?",
+                updates,
+            )
+
+    def get_embedding_matrix(self) -> Optional[np.ndarray]:
+        """以只读 memmap 返回整个侧车文件，形状 (行数, dim)，行号即 items.emb_idx；没有数据时返回 None。
+
+        数组保持存储精度：int8 时每行需乘以该条目的 embedding_scale 才是原向量。
+        """
+        import numpy as np
+
+        dim = self.get_metadata(_EMBEDDING_DIM_KEY)
+        dtype_name = self.get_metadata(_EMBEDDING_DTYPE_KEY) or "float32"
+        if not dim or dtype_name not in _EMBEDDING_DTYPES or not self.embeddings_path.exists():
+            return None
+        dim = int(dim)
+        dtype = np.dtype(dtype_name)
+        n_rows = self.embeddings_path.stat().st_size // (dim * dtype.itemsize)
+        if n_rows == 0:
+            return None
+        return np.memmap(self.embeddings_path, dtype=dtype, mode="r", shape=(n_rows, dim))
+
+    def convert_embedding_dtype(self) -> int:
+        """侧车文件的存储精度与 ZOTWATCHER_EMBEDDING_DTYPE 不一致时，就地转换已有向量。
+
+        按块读出旧精度（int8 乘回各行 scale）再写成新精度，写完临时文件后与 embedding_scale、
+        embedding_dtype 的更新一并提交；无需重新编码。返回转换的行数。
+        """
+        import numpy as np
+
+        stored = self.get_metadata(_EMBEDDING_DTYPE_KEY) or "float32"
+        if stored == self.embedding_dtype or stored not in _EMBEDDING_DTYPES:
+            return 0
+        matrix = self.get_embedding_matrix()
+        conn = self.connect()
+        if matrix is None:
+            self.set_metadata(_EMBEDDING_DTYPE_KEY, self.embedding_dtype)
+            return 0
+        n_rows = len(matrix)
+        old_scales = np.ones(len(matrix), dtype=np.float32)
+        new_scales = np.ones(len(matrix), dtype=np.float32)
+        slots = conn.execute(
+            "SELECT emb_idx, embedding_scale FROM items WHERE emb_idx IS NOT NULL"
+        ).fetchall()
+        if matrix.dtype == np.int8:
+            for idx, scale in slots:
+                if idx < len(matrix) and scale:
+                    old_scales[idx] = scale
+        dtype = np.dtype(self.embedding_dtype)
+        tmp_path = self.embeddings_path.with_name(self.embeddings_path.name + ".tmp")
+        with tmp_path.open("wb") as fh:
+            for start in range(0, len(matrix), _FETCH_SIZE):
+                block = np.asarray(matrix[start:start + _FETCH_SIZE], dtype=np.float32)
+                block = block * old_scales[start:start + _FETCH_SIZE, None]
+                if dtype == np.int8:
+                    # 与 quantize_i8 一致：每行按最大绝对值 / 127 取 scale
+                    scales = np.abs(block).max(axis=1, initial=0.0) / 127.0
+                    scales[scales == 0] = 1.0
+                    new_scales[start:start + len(block)] = scales
+                    block = np.round(block / scales[:, None])
+                fh.write(block.astype(dtype).tobytes())
+        del matrix
+        with conn:
+            conn.executemany(
+                "UPDATE items SET embedding_scale = ? WHERE emb_idx = ?",
+                (
+                    (float(new_scales[idx]) if dtype == np.int8 else None, idx)
+                    for idx, _ in slots
+                ),
+            )
+            conn.execute(
+                "REPLACE INTO metadata(key, value) VALUES(?, ?)",
+                (_EMBEDDING_DTYPE_KEY, self.embedding_dtype),
+            )
+            # 在事务提交前替换文件：替换失败时数据库回滚，仍与旧文件一致
+            os.replace(tmp_path, self.embeddings_path)
+        return n_rows
+
+    def _ensure_embedding_file(self, dim: int) -> None:
+        if (
+            self.get_metadata(_EMBEDDING_DIM_KEY) == str(dim)
+            and (self.get_metadata(_EMBEDDING_DTYPE_KEY) or "float32") == self.embedding_dtype
+            and self.embeddings_path.exists()
+        ):
+            return
+        # 维度（更换模型）或存储精度变化、文件丢失：旧行号全部失效，换成新的空文件
+        _replace_with_empty_file(self.embeddings_path)
+        conn = self.connect()
+        with conn:
+            conn.execute("UPDATE items SET emb_idx = NULL WHERE emb_idx IS NOT NULL")
+            conn.execute("DELETE FROM free_emb_slots")
+            conn.executemany(
+                "REPLACE INTO metadata(key, value) VALUES(?, ?)",
+                [(_EMBEDDING_DIM_KEY, str(dim)), (_EMBEDDING_DTYPE_KEY, self.embedding_dtype)],
+            )
 
     def iter_items(self) -> Iterable[ZoteroItem]:
         cur = self.connect().execute("SELECT * FROM items")
-        for row in cur:
+        for row in _iter_rows(cur):
             yield _row_to_item(row)
 
     def fetch_items_without_embedding(self) -> List[Tuple[ZoteroItem, Optional[str]]]:
         cur = self.connect().execute(
-            "SELECT * FROM items WHERE embedding IS NULL ORDER BY updated_at ASC"
+            "SELECT * FROM items WHERE embedding IS NULL AND emb_idx IS NULL ORDER BY updated_at ASC"
         )
         rows = cur.fetchall()
         return [(_row_to_item(row), row["content_hash"]) for row in rows]
 
-    def fetch_all_embeddings(self) -> List[Tuple[str, bytes]]:
-        cur = self.connect().execute(
-            "SELECT key, embedding FROM items WHERE embedding IS NOT NULL"
-        )
-        return [(row["key"], row["embedding"]) for row in cur]
+    def fetch_all_embeddings(self) -> List[Tuple[str, np.ndarray]]:
+        matrix = self.get_embedding_matrix()
+        cur = self.connect().execute(f"SELECT key, {_EMBEDDING_COLUMNS} FROM items WHERE {_HAS_EMBEDDING}")
+        result = []
+        for row in cur:
+            vector = _row_embedding(row, matrix)
+            if vector is not None:
+                result.append((row["key"], vector))
+        return result
+
+    def fetch_all_embeddings_matrix(self, dim: int) -> Tuple[List[str], np.ndarray]:
+        """读出所有 embedding，返回 (keys, (N, dim) float32 矩阵)，行号与 keys 对应。
+
+        只需要按 emb_idx 访问时可直接使用 get_embedding_matrix()，无需复制。
+        """
+        import numpy as np
+
+        conn = self.connect()
+        (total,) = conn.execute(f"SELECT COUNT(*) FROM items WHERE {_HAS_EMBEDDING}").fetchone()
+        source = self.get_embedding_matrix()
+        keys: List[str] = []
+        matrix = np.empty((total, dim), dtype=np.float32)
+        cur = conn.execute(f"SELECT key, {_EMBEDDING_COLUMNS} FROM items WHERE {_HAS_EMBEDDING}")
+        for row in cur:
+            if len(keys) == total:
+                break
+            vector = _row_embedding(row, source)
+            if vector is None:
+                continue
+            matrix[len(keys)] = vector
+            keys.append(row["key"])
+        return keys, matrix[: len(keys)]
 
     def save_collections(self, collections: dict) -> None:
         """保存分类信息到数据库（接受 Dict[str, ZoteroCollection]）"""
         conn = self.connect()
-        # 确保表存在
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS zotero_collections (
-                key TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                parent_key TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_collections_parent ON zotero_collections(parent_key)")
+        with conn:
+            # 确保表存在
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS zotero_collections (
+                    key TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    parent_key TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_collections_parent ON zotero_collections(parent_key)")
 
-        # 清空旧数据并插入新数据
-        conn.execute("DELETE FROM zotero_collections")
-        for coll in collections.values():
-            conn.execute(
+            # 清空旧数据并插入新数据
+            conn.execute("DELETE FROM zotero_collections")
+            conn.executemany(
                 "INSERT INTO zotero_collections(key, name, parent_key) VALUES(?, ?, ?)",
-                (coll.key, coll.name, coll.parent_key),
+                ((coll.key, coll.name, coll.parent_key) for coll in collections.values()),
             )
-        conn.commit()
 
     def load_collections(self) -> dict:
         """从数据库加载分类信息，返回 Dict[str, dict]"""
@@ -285,13 +555,157 @@ class ProfileStorage:
             # 表不存在
             return {}
 
-    def iter_items_in_collections(self, collection_ids: List[str]) -> Iterable[ZoteroItem]:
-        """迭代属于指定分类的所有条目"""
-        for item in self.iter_items():
-            for coll_id in item.collections:
-                if coll_id in collection_ids:
-                    yield item
-                    break
+    def count_items(self) -> int:
+        cur = self.connect().execute("SELECT COUNT(*) FROM items")
+        return cur.fetchone()[0]
+
+    def iter_items_in_collections(self, collection_ids: Iterable[str]) -> Iterable[ZoteroItem]:
+        """迭代属于指定分类的所有条目（过滤在 SQLite 中完成）"""
+        for row in _iter_rows(self._select_in_collections(collection_ids)):
+            yield _row_to_item(row)
+
+    def iter_items_with_embedding(
+        self, collection_ids: Optional[Iterable[str]] = None
+    ) -> Iterable[Tuple[ZoteroItem, Optional[str], Optional[np.ndarray], Optional[str]]]:
+        """迭代条目及其 content_hash、已存储的 embedding（float32）与 embedding_hash"""
+        matrix = self.get_embedding_matrix()
+        if collection_ids is None:
+            cur = self.connect().execute("SELECT * FROM items")
+        else:
+            cur = self._select_in_collections(collection_ids)
+        for row in _iter_rows(cur):
+            embedding = _row_embedding(row, matrix)
+            yield _row_to_item(row), row["content_hash"], embedding, row["embedding_hash"]
+
+    def count_items_in_collections(self, collection_ids: Iterable[str]) -> int:
+        self._load_allowed_collections(collection_ids)
+        cur = self.connect().execute(f"SELECT COUNT(*) FROM items WHERE {_IN_ALLOWED_COLLECTIONS}")
+        return cur.fetchone()[0]
+
+    def _select_in_collections(self, collection_ids: Iterable[str]) -> sqlite3.Cursor:
+        self._load_allowed_collections(collection_ids)
+        return self.connect().execute(f"SELECT * FROM items WHERE {_IN_ALLOWED_COLLECTIONS}")
+
+    def _load_allowed_collections(self, collection_ids: Iterable[str]) -> None:
+        """把分类 ID 写入临时表，供 _IN_ALLOWED_COLLECTIONS 条件使用"""
+        conn = self.connect()
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS allowed_collections(id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM allowed_collections")
+            conn.executemany(
+                "INSERT OR IGNORE INTO allowed_collections(id) VALUES(?)",
+                ((coll_id,) for coll_id in collection_ids),
+            )
+
+
+# 通过 item_collections 上的 coll_key 索引查找条目；分类 ID 放在临时表中，不受参数个数上限限制
+_IN_ALLOWED_COLLECTIONS = """
+    items.key IN (
+        SELECT ic.item_key FROM item_collections AS ic
+        WHERE ic.coll_key IN (SELECT id FROM allowed_collections)
+    )
+"""
+
+
+# emb_idx 指向侧车文件；embedding 列仅保留旧版本写入、尚未迁移的 BLOB
+_HAS_EMBEDDING = "(emb_idx IS NOT NULL OR embedding IS NOT NULL)"
+_EMBEDDING_COLUMNS = "emb_idx, embedding, embedding_scale"
+
+
+_UPSERT_ITEM_SQL = """
+    INSERT INTO items(
+        key, version, title, abstract, creators, tags, collections, year, doi, url, raw_json, content_hash
+    ) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(key) DO UPDATE SET
+        version=excluded.version,
+        title=excluded.title,
+        abstract=excluded.abstract,
+        creators=excluded.creators,
+        tags=excluded.tags,
+        collections=excluded.collections,
+        year=excluded.year,
+        doi=excluded.doi,
+        url=excluded.url,
+        raw_json=excluded.raw_json,
+        content_hash=excluded.content_hash,
+        updated_at=CURRENT_TIMESTAMP
+"""
+
+
+def _item_to_row(item: ZoteroItem, content_hash: Optional[str]) -> tuple:
+    return (
+        item.key,
+        item.version,
+        item.title,
+        item.abstract,
+        _dumps(item.creators),
+        _dumps(item.tags),
+        _dumps(item.collections),
+        item.year,
+        item.doi,
+        item.url,
+        item.raw_json(),
+        content_hash,
+    )
+
+
+def quantize_i8(vector: np.ndarray) -> Tuple[bytes, float]:
+    """float32 向量按向量级 scale 量化为 int8，体积缩小为 1/4"""
+    import numpy as np
+
+    vector = np.asarray(vector, dtype=np.float32)
+    scale = float(np.abs(vector).max(initial=0.0)) / 127.0 or 1.0
+    quantized = np.round(vector / scale).astype(np.int8)
+    return quantized.tobytes(), scale
+
+
+def dequantize_i8(blob: bytes, scale: Optional[float]) -> np.ndarray:
+    """还原 int8 embedding；scale 为空表示旧版本写入的原始 float32"""
+    import numpy as np
+
+    if scale is None:
+        return np.frombuffer(blob, dtype=np.float32)
+    return np.frombuffer(blob, dtype=np.int8).astype(np.float32) * np.float32(scale)
+
+
+# 流式读取时每次从游标取出的行数，减少逐行跨越 Python/C 边界
+_FETCH_SIZE = 1000
+
+
+def _iter_rows(cur: sqlite3.Cursor) -> Iterable[sqlite3.Row]:
+    cur.arraysize = _FETCH_SIZE
+    while True:
+        rows = cur.fetchmany()
+        if not rows:
+            return
+        yield from rows
+
+
+def _row_embedding(row: sqlite3.Row, matrix: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """按 emb_idx 从侧车文件取向量，旧数据回退到 embedding BLOB"""
+    import numpy as np
+
+    idx = row["emb_idx"]
+    if idx is not None:
+        if matrix is None or idx >= len(matrix):
+            return None
+        if matrix.dtype == np.int8:
+            return matrix[idx].astype(np.float32) * np.float32(row["embedding_scale"] or 1.0)
+        return np.asarray(matrix[idx], dtype=np.float32)
+    if row["embedding"] is not None:
+        return dequantize_i8(row["embedding"], row["embedding_scale"])
+    return None
+
+
+def _replace_with_empty_file(path: Path) -> None:
+    # 用 os.replace 换成新文件而不是原地截断，已打开的 memmap 仍映射旧文件，不会越界
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(b"")
+    os.replace(tmp_path, path)
+
+
+def _dumps(value: object) -> str:
+    return json_dumps_bytes(value, sort_keys=False).decode("utf-8")
 
 
 def _row_to_item(row: sqlite3.Row) -> ZoteroItem:
@@ -300,13 +714,13 @@ def _row_to_item(row: sqlite3.Row) -> ZoteroItem:
         version=row["version"],
         title=row["title"],
         abstract=row["abstract"],
-        creators=json.loads(row["creators"] or "[]"),
-        tags=json.loads(row["tags"] or "[]"),
-        collections=json.loads(row["collections"] or "[]"),
+        creators=json_loads(row["creators"]) if row["creators"] else [],
+        tags=json_loads(row["tags"]) if row["tags"] else [],
+        collections=json_loads(row["collections"]) if row["collections"] else [],
         year=row["year"],
         doi=row["doi"],
         url=row["url"],
-        raw=json.loads(row["raw_json"]),
+        raw_json=row["raw_json"],
     )
 
 
@@ -3,19 +3,63 @@ from __future__ import annotations
 import hashlib
 import json
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Iterable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
 
 
 def json_dumps(data: Any, *, indent: int | None = None) -> str:
     return json.dumps(data, ensure_ascii=False, indent=indent, sort_keys=True)
 
 
-def hash_content(*parts: str) -> str:
-    sha = hashlib.sha256()
+def json_dumps_bytes(data: Any, *, indent: int | None = None, sort_keys: bool = True) -> bytes:
+    """序列化为 UTF-8 JSON 字节，可直接包含 numpy 数组；优先使用 orjson。
+
+    仅供程序内部读写的数据（如数据库字段）可传 sort_keys=False，省去键排序。
+    """
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    return json.dumps(
+        data, ensure_ascii=False, indent=indent, sort_keys=sort_keys, default=_json_default
+    ).encode("utf-8")
+
+
+def json_loads(data: str | bytes) -> Any:
+    """解析 JSON 文本或字节；优先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def hash_content(*parts: str | Iterable[str]) -> str:
+    """对若干字符串或字符串序列做增量哈希，序列元素直接喂给哈希器而不先拼接。
+
+    各部分及序列元素之间写入分隔字节，避免 ("ab", "c") 与 ("a", "bc") 冲突。
+    """
+    blake = hashlib.blake2b(digest_size=16)
     for part in parts:
-        if part:
-            sha.update(part.encode("utf-8"))
-    return sha.hexdigest()
+        blake.update(b"\x00")
+        if isinstance(part, str):
+            blake.update(part.encode("utf-8"))
+            continue
+        for value in part:
+            blake.update(b"\x01")
+            blake.update(value.encode("utf-8"))
+    return blake.hexdigest()
 
 
 def utc_now() -> datetime:
@@ -47,4 +91,4 @@ def chunk_dict(d: Dict[str, Any], *, max_len: int = 80) -> Dict[str, Any]:
     return result
 
 
-__all__ = ["hash_content", "json_dumps", "utc_now", "ensure_isoformat", "iso_to_datetime"]
+__all__ = ["hash_content", "json_dumps", "json_dumps_bytes", "json_loads", "utc_now", "ensure_isoformat", "iso_to_datetime"]
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import logging
-from typing import Iterable, List
+import multiprocessing
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import numpy as np
 
@@ -12,36 +15,190 @@ try:
 except ImportError:  # pragma: no cover - handled via runtime requirement
     SentenceTransformer = None  # type: ignore
 
+try:
+    import torch
+except ImportError:  # pragma: no cover - installed alongside sentence-transformers
+    torch = None  # type: ignore
+
+# 编码后端：torch 为默认的 PyTorch 推理；onnx-int8 首次使用时导出 ONNX 并做动态 int8 量化，
+# 之后从本地缓存目录加载（需要 sentence-transformers[onnx]>=3.2）
+ENCODE_BACKENDS = ("torch", "onnx-int8")
+_ONNX_QUANTIZATION_CONFIG = "avx2"
+_ONNX_FILE_SUFFIX = f"qint8_{_ONNX_QUANTIZATION_CONFIG}"
+
 
 class TextVectorizer:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        parallel: Union[bool, int] = False,
+        backend: str = "torch",
+        cache_dir: Path | str = Path("data") / "models",
+    ):
+        if backend not in ENCODE_BACKENDS:
+            raise ValueError(f"Unsupported encode backend '{backend}'. Allowed: {list(ENCODE_BACKENDS)}")
         self.model_name = model_name
+        self.parallel = parallel
+        self.backend = backend
+        self.cache_dir = Path(cache_dir)
         self._model = None
+        self._pool = None
+        self._pool_size = 0
 
     def load(self) -> None:
         if self._model is not None:
             return
-        if SentenceTransformer is None:
-            raise RuntimeError(
-                "sentence-transformers is not installed. Install it or adjust requirements."
-            )
-        logger.info("Loading embedding model %s", self.model_name)
-        self._model = SentenceTransformer(self.model_name)
+        logger.info("Loading embedding model %s (%s)", self.model_name, self.backend)
+        if self.backend == "onnx-int8":
+            _export_onnx_int8(self.model_name, self.cache_dir)
+        self._model = _load_model(self.model_name, self.backend, self.cache_dir)
+
+    @property
+    def embedding_id(self) -> str:
+        """标识向量来源（模型 + 后端），不同后端的向量不可混用"""
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}@{self.backend}"
 
     @property
     def model(self):  # type: ignore
         self.load()
         return self._model
 
-    def encode(self, texts: Iterable[str]) -> np.ndarray:
-        self.load()
-        embeddings = self.model.encode(list(texts), show_progress_bar=False)
-        embeddings = np.asarray(embeddings, dtype=np.float32)
-        norms = np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
-        return embeddings / norms
+    def encode(self, texts: Iterable[str], batch_size: int = 32) -> np.ndarray:
+        texts = list(texts)
+        # 相同文本（如多个来源返回的同一篇论文）只编码一次，再按原顺序展开
+        positions: Dict[str, int] = {}
+        inverse = [positions.setdefault(text, len(positions)) for text in texts]
+        if len(positions) < len(texts):
+            logger.debug("Encoding %d unique texts out of %d", len(positions), len(texts))
+            return self._encode_unique(list(positions), batch_size)[np.asarray(inverse, dtype=np.intp)]
+        return self._encode_unique(texts, batch_size)
+
+    def _encode_unique(self, texts: List[str], batch_size: int) -> np.ndarray:
+        workers = self._worker_count()
+        if workers > 1 and len(texts) > 1:
+            embeddings = self._encode_parallel(texts, batch_size, workers)
+        else:
+            self.load()
+            embeddings = self.model.encode(
+                texts, batch_size=batch_size, show_progress_bar=False, normalize_embeddings=True
+            )
+        # 向量在模型侧完成 L2 归一化，内积即余弦相似度
+        return np.asarray(embeddings, dtype=np.float32)
 
     def encode_single(self, text: str) -> np.ndarray:
         return self.encode([text])[0]
 
+    def close(self) -> None:
+        """关闭多进程编码池（如果已启动）"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            self._pool_size = 0
+
+    def _worker_count(self) -> int:
+        if not self.parallel:
+            return 0
+        if torch is not None and torch.cuda.is_available():
+            # GPU 上单进程批量编码更快，不启用多进程
+            return 0
+        if self.parallel is True:
+            return os.cpu_count() or 1
+        return int(self.parallel)
+
+    def _encode_parallel(self, texts: List[str], batch_size: int, workers: int) -> np.ndarray:
+        if self._pool is None or self._pool_size != workers:
+            self.close()
+            if self.backend == "onnx-int8":
+                # 先在主进程完成导出，worker 只加载缓存
+                _export_onnx_int8(self.model_name, self.cache_dir)
+            logger.info("Starting %d encoding worker processes for %s", workers, self.model_name)
+            ctx = multiprocessing.get_context("spawn")
+            self._pool = ctx.Pool(
+                workers,
+                initializer=_init_worker,
+                initargs=(self.model_name, self.backend, self.cache_dir),
+            )
+            self._pool_size = workers
+        # 每个分块只有一个批次，model.encode 内部的按长度排序不起作用；
+        # 这里先按文本长度全局排序再分块，使同一批次填充到相近长度，最后还原顺序
+        order = np.argsort(np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)), kind="stable")
+        sorted_texts = [texts[i] for i in order]
+        chunk_size = min(batch_size, -(-len(texts) // workers))
+        chunks = [
+            (sorted_texts[i : i + chunk_size], batch_size) for i in range(0, len(sorted_texts), chunk_size)
+        ]
+        encoded = np.concatenate(list(self._pool.imap(_encode_chunk, chunks)), axis=0)
+        restored = np.empty_like(encoded)
+        restored[order] = encoded
+        return restored
+
+
+_worker_model = None
+
+
+def _onnx_model_path(model_name: str, cache_dir: Path) -> Tuple[Path, str]:
+    """量化 ONNX 模型的本地缓存目录及其中的模型文件名"""
+    return cache_dir / f"{model_name.replace('/', '__')}-onnx", f"onnx/model_{_ONNX_FILE_SUFFIX}.onnx"
+
+
+def _export_onnx_int8(model_name: str, cache_dir: Path) -> None:
+    """缓存中没有量化模型时导出一次；只在主进程调用，避免多个 worker 同时写同一目录"""
+    local_dir, file_name = _onnx_model_path(model_name, cache_dir)
+    if (local_dir / file_name).exists():
+        return
+    if SentenceTransformer is None:
+        raise RuntimeError(
+            "sentence-transformers is not installed. Install it or adjust requirements."
+        )
+    try:
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+    except ImportError as exc:
+        raise RuntimeError(
+            "encode backend 'onnx-int8' requires sentence-transformers[onnx]>=3.2."
+        ) from exc
+    logger.info("Exporting %s to quantized ONNX in %s", model_name, local_dir)
+    model = SentenceTransformer(model_name, backend="onnx")
+    model.save(str(local_dir))
+    # 量化文件最后写入，存在即表示导出完整
+    export_dynamic_quantized_onnx_model(
+        model, _ONNX_QUANTIZATION_CONFIG, str(local_dir), file_suffix=_ONNX_FILE_SUFFIX
+    )
+
+
+def _load_model(model_name: str, backend: str, cache_dir: Path, device: Optional[str] = None):
+    """加载模型；onnx-int8 只读取已导出的缓存，导出由 _export_onnx_int8 负责"""
+    if SentenceTransformer is None:
+        raise RuntimeError(
+            "sentence-transformers is not installed. Install it or adjust requirements."
+        )
+    if backend == "torch":
+        return SentenceTransformer(model_name, device=device)
+
+    local_dir, file_name = _onnx_model_path(model_name, cache_dir)
+    if not (local_dir / file_name).exists():
+        raise RuntimeError(f"Quantized ONNX model not found in {local_dir}; export it first.")
+    return SentenceTransformer(
+        str(local_dir), backend="onnx", device=device, model_kwargs={"file_name": file_name}
+    )
+
+
+def _init_worker(model_name: str, backend: str, cache_dir: Path) -> None:
+    global _worker_model
+    if torch is not None:
+        # 每个进程一个线程，避免与其他 worker 争抢 CPU
+        torch.set_num_threads(1)
+    _worker_model = _load_model(model_name, backend, cache_dir, device="cpu")
+
+
+def _encode_chunk(args) -> np.ndarray:
+    texts, batch_size = args
+    embeddings = _worker_model.encode(
+        texts, batch_size=batch_size, show_progress_bar=False, normalize_embeddings=True
+    )
+    return np.asarray(embeddings, dtype=np.float32)
+
 
 __all__ = ["TextVectorizer"]
@@ -0,0 +1,47 @@
+from src.collections_index import CollectionPathIndex
+from src.ingest_zotero_api import ZoteroCollection
+
+
+def test_duplicate_name_resolves_to_first_entry():
+    # B 是 A 的子分类，但在 entries 中先出现：同名时按出现顺序取 B
+    index = CollectionPathIndex([("B", "X", "A"), ("A", "X", None)])
+    assert index.resolve("X") == "B"
+    assert index.resolve("X/X") == "B"
+
+
+def test_duplicate_path_suffix_resolves_to_first_entry():
+    index = CollectionPathIndex(
+        [
+            ("C2", "Child", "P2"),
+            ("P1", "Root1", None),
+            ("C1", "Child", "P1"),
+            ("P2", "Root2", None),
+        ]
+    )
+    assert index.resolve("Child") == "C2"
+    assert index.resolve("Root1/Child") == "C1"
+    assert index.resolve(" Root2 / Child ") == "C2"
+    assert index.resolve("Missing/Child") is None
+
+
+def test_full_paths_and_descendants():
+    index = CollectionPathIndex([("A", "Root", None), ("B", "Child", "A"), ("C", "Leaf", "B")])
+    assert index.full_path("C") == "Root/Child/Leaf"
+    assert index.descendants("A") == {"A", "B", "C"}
+    assert index.keys_by_name("Child") == ["B"]
+
+
+def test_parent_cycle_terminates():
+    index = CollectionPathIndex([("X", "One", "Y"), ("Y", "Two", "X")])
+    assert index.full_path("X") is not None
+    assert index.full_path("Y") is not None
+    assert index.descendants("X") == {"X", "Y"}
+
+
+def test_from_collections_uses_zotero_collections():
+    collections = {
+        "A": ZoteroCollection(key="A", name="Root"),
+        "B": ZoteroCollection(key="B", name="Child", parent_key="A"),
+    }
+    index = CollectionPathIndex.from_collections(collections)
+    assert index.resolve("Root/Child") == "B"
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+
+from src.fetch_new import CandidateFetcher
+from src.settings import ScoringConfig, Settings, SourcesConfig, ZoteroConfig
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class _FakeSession:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        return _FakeResponse(self.text)
+
+
+def _atom_feed(entries):
+    body = "".join(
+        f"<entry><id>{entry_id}</id><title>{entry_id}</title>"
+        f"<published>{published.strftime('%Y-%m-%dT%H:%M:%SZ')}</published>"
+        f"<summary>s</summary></entry>"
+        for entry_id, published in entries
+    )
+    return f'<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom">{body}</feed>'
+
+
+def test_fetch_arxiv_stops_at_first_entry_older_than_since(tmp_path):
+    settings = Settings(
+        zotero=ZoteroConfig(api={"user_id": "1"}), sources=SourcesConfig(), scoring=ScoringConfig()
+    )
+    fetcher = CandidateFetcher(settings, tmp_path)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    since = now - timedelta(days=3)
+    # 按提交时间倒序；最后一条虽在窗口内，但排在过期条目之后，说明遍历已在过期处停止
+    fetcher.session = _FakeSession(
+        _atom_feed(
+            [
+                ("new-1", now - timedelta(hours=1)),
+                ("new-2", now - timedelta(days=2)),
+                ("old-1", now - timedelta(days=5)),
+                ("after-old", now - timedelta(hours=2)),
+            ]
+        )
+    )
+
+    works = fetcher._fetch_arxiv(since)
+
+    assert [work.identifier for work in works] == ["new-1", "new-2"]
+    assert all(work.published >= since for work in works)
+    assert fetcher.session.calls == 1
@@ -0,0 +1,41 @@
+import pytest
+from pydantic import ValidationError
+
+from src.settings import ScoringConfig, Settings, SourcesConfig, ZoteroConfig, _runtime_overrides
+
+
+def _settings(monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return Settings(
+        zotero=ZoteroConfig(api={"user_id": "1"}),
+        sources=SourcesConfig(),
+        scoring=ScoringConfig(),
+        **_runtime_overrides(),
+    )
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("1", 1), ("0", 0), ("4", 4), ("true", True), ("False", False), ("on", True)],
+)
+def test_encode_parallel_env_keeps_worker_counts(monkeypatch, value, expected):
+    parallel = _settings(monkeypatch, ZOTWATCHER_ENCODE_PARALLEL=value).encode_parallel
+    assert parallel == expected
+    assert type(parallel) is type(expected)
+
+
+def test_encode_parallel_env_rejects_garbage(monkeypatch):
+    with pytest.raises(ValueError):
+        _settings(monkeypatch, ZOTWATCHER_ENCODE_PARALLEL="many")
+
+
+@pytest.mark.parametrize("value", ["0", "-8"])
+def test_encode_batch_size_must_be_positive(monkeypatch, value):
+    with pytest.raises(ValidationError):
+        _settings(monkeypatch, ZOTWATCHER_ENCODE_BATCH_SIZE=value)
+
+
+def test_encode_backend_typo_fails(monkeypatch):
+    with pytest.raises(ValidationError):
+        _settings(monkeypatch, ZOTWATCHER_ENCODE_BACKEND="onnx")
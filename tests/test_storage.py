@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from src.models import ZoteroItem
+from src.storage import ProfileStorage, quantize_i8
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.delenv("ZOTWATCHER_EMBEDDING_DTYPE", raising=False)
+    st = ProfileStorage(tmp_path / "profile.sqlite")
+    st.initialize()
+    st.upsert_items(
+        (ZoteroItem(key=f"K{i}", version=1, title=f"t{i}", collections=["A" if i < 3 else "B"]), f"h{i}")
+        for i in range(5)
+    )
+    yield st
+    st.close()
+
+
+def _vectors(keys, dim=8):
+    rng = np.random.default_rng(0)
+    return {key: rng.standard_normal(dim).astype(np.float32) for key in keys}
+
+
+def test_fetch_all_embeddings_matrix_reads_sidecar(storage):
+    vectors = _vectors(["K0", "K1", "K3"])
+    storage.set_embeddings_bulk((key, vec, "e") for key, vec in vectors.items())
+
+    keys, matrix = storage.fetch_all_embeddings_matrix(8)
+
+    assert sorted(keys) == ["K0", "K1", "K3"]
+    assert matrix.shape == (3, 8) and matrix.dtype == np.float32
+    for key, row in zip(keys, matrix):
+        np.testing.assert_allclose(row, vectors[key], atol=0.05)
+    assert dict(storage.fetch_all_embeddings()).keys() == set(keys)
+
+
+def test_legacy_blob_embeddings_are_still_read(storage):
+    blob, scale = quantize_i8(np.ones(8, dtype=np.float32))
+    with storage.connect() as conn:
+        conn.execute("UPDATE items SET embedding = ?, embedding_scale = ? WHERE key = 'K4'", (blob, scale))
+
+    keys, matrix = storage.fetch_all_embeddings_matrix(8)
+
+    assert keys == ["K4"]
+    np.testing.assert_allclose(matrix[0], np.ones(8), atol=0.01)
+
+
+def test_fetch_items_without_embedding_and_collections(storage):
+    storage.set_embeddings_bulk([("K0", np.ones(8, dtype=np.float32), "e")])
+
+    pending = [item.key for item, _ in storage.fetch_items_without_embedding()]
+    in_a = sorted(item.key for item in storage.iter_items_in_collections(["A"]))
+
+    assert sorted(pending) == ["K1", "K2", "K3", "K4"]
+    assert in_a == ["K0", "K1", "K2"]
+
+
+def test_removed_items_free_sidecar_rows(storage):
+    storage.set_embeddings_bulk((key, vec, "e") for key, vec in _vectors(["K0", "K1", "K2"]).items())
+    rows_before = storage.get_embedding_matrix().shape[0]
+
+    storage.remove_items(["K1"])
+    storage.set_embeddings_bulk([("K3", np.ones(8, dtype=np.float32), "e")])
+
+    assert storage.get_embedding_matrix().shape[0] == rows_before
+    assert "K3" in dict(storage.fetch_all_embeddings())
+
+
+def test_pending_embedding_query_uses_partial_index(storage):
+    plan = " ".join(
+        row["detail"]
+        for row in storage.connect().execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM items "
+            "WHERE embedding IS NULL AND emb_idx IS NULL ORDER BY updated_at ASC"
+        )
+    )
+    assert "idx_items_no_emb" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.parametrize("target", ["float16", "float32"])
+def test_changing_dtype_converts_sidecar_in_place(storage, target):
+    vectors = _vectors(["K0", "K1", "K3"])
+    storage.set_embeddings_bulk((key, vec, "e") for key, vec in vectors.items())
+    slots_before = dict(storage.connect().execute("SELECT key, emb_idx FROM items"))
+
+    storage.embedding_dtype = target
+    assert storage.convert_embedding_dtype() == 3
+    assert storage.convert_embedding_dtype() == 0
+
+    assert storage.get_metadata("embedding_dtype") == target
+    assert storage.get_embedding_matrix().dtype == np.dtype(target)
+    assert dict(storage.connect().execute("SELECT key, emb_idx FROM items")) == slots_before
+    # 之后的写入沿用已转换的文件，不会把其它行号作废
+    storage.set_embeddings_bulk([("K4", np.ones(8, dtype=np.float32), "e")])
+    keys, matrix = storage.fetch_all_embeddings_matrix(8)
+    assert sorted(keys) == ["K0", "K1", "K3", "K4"]
+    for key, row in zip(keys, matrix):
+        np.testing.assert_allclose(row, vectors.get(key, np.ones(8)), atol=0.05)
+
+
+def test_converting_back_to_int8_requantizes(storage):
+    storage.embedding_dtype = "float32"
+    vectors = _vectors(["K0", "K2"])
+    storage.set_embeddings_bulk((key, vec, "e") for key, vec in vectors.items())
+
+    storage.embedding_dtype = "int8"
+    assert storage.convert_embedding_dtype() == 2
+
+    assert storage.get_embedding_matrix().dtype == np.int8
+    for key, vec in storage.fetch_all_embeddings():
+        np.testing.assert_allclose(vec, vectors[key], atol=0.05)